@@ -0,0 +1,99 @@
+import json
+import logging
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Optional
+
+from requests import Response
+
+try:
+    import orjson
+except ImportError:  # orjson не обязателен: без него используется стандартный json
+    orjson = None
+
+DEFAULT_ARTIFACT_DIR = Path(__file__).resolve().parent.parent / ".cache" / "api_payloads"
+
+
+def loads(content: bytes) -> Any:
+    """Декодирование JSON из байтов: orjson, если он установлен, иначе стандартный json."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+class BodyPreview:
+    """Превью тела ответа для лога: строка формируется, только если сообщение действительно выводится."""
+
+    def __init__(self, content: bytes, encoding: Optional[str], limit: int):
+        self.content = content
+        self.encoding = encoding or "utf-8"
+        self.limit = limit
+
+    def __str__(self) -> str:
+        text = self.content[:self.limit * 4].decode(self.encoding, errors="replace")
+        if len(self.content) <= self.limit * 4 and len(text) <= self.limit:
+            return text
+        return f"{text[:self.limit]}... ({len(self.content)} байт)"
+
+
+class ApiResult:
+    """
+    Ответ API, тело которого декодируется один раз.
+    Лог тела ограничен превью; тело больше ARTIFACT_THRESHOLD байт сохраняется в файл в ARTIFACT_DIR,
+    а в лог выводится превью и путь к файлу.
+    Тело читается в память целиком, без stream=True: оно все равно нужно целиком для декодирования JSON.
+    """
+    # Длина превью тела в логе, символов
+    PREVIEW_LIMIT = int(os.getenv("API_LOG_PREVIEW", "500"))
+    # Размер тела, начиная с которого оно сохраняется в файл (0 — не сохранять), байт
+    ARTIFACT_THRESHOLD = int(os.getenv("API_ARTIFACT_THRESHOLD", "4096"))
+    ARTIFACT_DIR = Path(os.getenv("API_ARTIFACT_DIR", DEFAULT_ARTIFACT_DIR))
+
+    def __init__(self, response: Response, endpoint: str):
+        """
+        :param response: Ответ requests.
+        :param endpoint: Имя эндпоинта (для лога и имени файла тела).
+        """
+        self.endpoint = endpoint
+        self.status_code = response.status_code
+        self.content = response.content
+        self.encoding = response.encoding
+        self._decode_error: Optional[ValueError] = None
+        try:
+            self._json = loads(self.content) if self.content else None
+        except ValueError as e:
+            self._json, self._decode_error = None, e
+
+    @property
+    def json(self) -> Any:
+        """Декодированное тело (None для пустого тела); если тело не JSON — AssertionError с превью тела."""
+        if self._decode_error is not None:
+            raise AssertionError(f"Ответ {self.endpoint} ({self.status_code}) не является JSON: {self._decode_error}. "
+                                 f"Тело: {self.preview()}")
+        return self._json
+
+    @property
+    def size(self) -> int:
+        return len(self.content)
+
+    def preview(self) -> BodyPreview:
+        return BodyPreview(self.content, self.encoding, self.PREVIEW_LIMIT)
+
+    def save_artifact(self) -> Path:
+        """Записывает тело ответа в файл как есть, без повторного кодирования."""
+        self.ARTIFACT_DIR.mkdir(parents=True, exist_ok=True)
+        path = self.ARTIFACT_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}-{self.endpoint}-{uuid.uuid4().hex[:6]}.json"
+        path.write_bytes(self.content)
+        return path
+
+    def log_body(self, logger: logging.Logger, level: int = logging.INFO) -> None:
+        """Выводит тело ответа в лог: превью, а большое тело — в файл."""
+        if not logger.isEnabledFor(level):
+            return
+        if 0 < self.ARTIFACT_THRESHOLD < self.size:
+            logger.log(level, "JSON ответа (%s байт) сохранен в %s: %s", self.size, self.save_artifact(),
+                       self.preview())
+        else:
+            logger.log(level, "JSON ответа: %s", self.preview())
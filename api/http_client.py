@@ -0,0 +1,109 @@
+import logging
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.metrics import CommandMetrics
+
+logger = logging.getLogger("API")
+
+
+class HttpClient:
+    """
+    HTTP-клиент тестовых API: одна requests.Session с пулом keep-alive соединений на каждый хост,
+    явные таймауты на подключение и чтение, повторы временных ошибок для идемпотентных запросов
+    и время ответа по каждому эндпоинту.
+    Установка соединения повторяется для любых запросов: до сервера запрос еще не дошел. Запрос целиком
+    (таймаут чтения, обрыв соединения, ответы 502/503/504) повторяется, только если он помечен идемпотентным.
+    """
+
+    RETRY_STATUSES = frozenset({502, 503, 504})
+
+    def __init__(self, connect_timeout: float = 5, read_timeout: float = 30, retries: int = 2,
+                 backoff: float = 0.5, max_backoff: float = 5, pool_maxsize: int = 8):
+        """
+        :param connect_timeout: Таймаут установки соединения, сек.
+        :param read_timeout: Таймаут ожидания ответа, сек.
+        :param retries: Количество повторов временной ошибки.
+        :param backoff: Базовая пауза между повторами, сек (растет экспоненциально, выбирается случайно до нее).
+        :param max_backoff: Максимальная пауза между повторами, сек.
+        :param pool_maxsize: Количество keep-alive соединений в пуле на хост.
+        """
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.pool_maxsize = pool_maxsize
+        self.metrics = CommandMetrics()
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "HttpClient":
+        """Клиент с настройками из переменных API_CONNECT_TIMEOUT, API_READ_TIMEOUT, API_RETRIES, API_POOL_MAXSIZE."""
+        return cls(connect_timeout=float(os.getenv("API_CONNECT_TIMEOUT", "5")),
+                   read_timeout=float(os.getenv("API_READ_TIMEOUT", "30")),
+                   retries=int(os.getenv("API_RETRIES", "2")),
+                   pool_maxsize=int(os.getenv("API_POOL_MAXSIZE", "8")))
+
+    def session(self, url: str) -> requests.Session:
+        """Сессия хоста из url; создается при первом запросе к хосту."""
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize,
+                                      max_retries=Retry(connect=self.retries, read=0, redirect=3, status=0, other=0,
+                                                        backoff_factor=self.backoff))
+                session.mount(f"{parts.scheme}://", adapter)
+                self._sessions[host] = session
+            return session
+
+    def _pause(self, attempt: int) -> float:
+        """Пауза перед повтором: случайная величина до экспоненциально растущего потолка (full jitter)."""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+    def request(self, method: str, url: str, endpoint: Optional[str] = None, idempotent: bool = False,
+                **kwargs) -> requests.Response:
+        """
+        Выполняет HTTP-запрос.
+        :param method: HTTP-метод.
+        :param url: Адрес запроса.
+        :param endpoint: Имя эндпоинта для статистики (по умолчанию метод и путь).
+        :param idempotent: Запрос можно безопасно повторить целиком.
+        :param kwargs: Параметры requests (headers, json, params, ...); timeout по умолчанию — таймауты клиента.
+        """
+        endpoint = endpoint or f"{method} {urlsplit(url).path}"
+        kwargs.setdefault("timeout", self.timeout)
+        attempts = self.retries + 1 if idempotent else 1
+        session = self.session(url)
+        for attempt in range(1, attempts + 1):
+            started = time.perf_counter()
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == attempts:
+                    raise
+                logger.warning(f"{endpoint}: {e}, повтор {attempt}/{self.retries}")
+            else:
+                if response.status_code not in self.RETRY_STATUSES or attempt == attempts:
+                    return response
+                logger.warning(f"{endpoint}: ответ {response.status_code}, повтор {attempt}/{self.retries}")
+            finally:
+                self.metrics.record(endpoint, time.perf_counter() - started)
+            time.sleep(self._pause(attempt))
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
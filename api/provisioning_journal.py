@@ -0,0 +1,196 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger("API")
+
+DEFAULT_JOURNAL_DIR = Path(__file__).resolve().parent.parent / ".cache" / "provisioning"
+
+# Статусы записи журнала
+IN_PROGRESS = "in_progress"
+FAILED = "failed"
+DONE = "done"
+ABANDONED = "abandoned"
+
+
+class ProvisioningJournal:
+    """
+    Журнал создания пользователей: результат каждого выполненного шага сохраняется в файл записи
+    (<provisioning_id>.json) сразу после шага. Повторная попытка продолжает незавершенную запись с первого
+    невыполненного шага, а не создает клиентов в CRM и WAY4 заново.
+    Запись, которую продолжает процесс, захватывается lock-файлом, поэтому одну запись не продолжают двое.
+    Каждое продолжение записи считается попыткой; после max_attempts попыток запись помечается брошенной
+    и больше не продолжается автоматически.
+    """
+
+    def __init__(self, journal_dir: Path = DEFAULT_JOURNAL_DIR, stale_after: float = 30 * 60, max_attempts: int = 3):
+        """
+        :param journal_dir: Каталог записей журнала.
+        :param stale_after: Время без обновлений, после которого запись in_progress считается брошенной
+            (процесс упал), а захват записи — устаревшим, сек.
+        :param max_attempts: Количество попыток создания по одной записи, включая первую.
+        """
+        self.journal_dir = Path(journal_dir)
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["ProvisioningJournal"]:
+        """
+        Журнал с настройками из окружения или None, если он не включен.
+        PROVISIONING_JOURNAL=true — включить; PROVISIONING_JOURNAL_DIR — каталог записей;
+        PROVISIONING_MAX_ATTEMPTS — количество попыток по одной записи.
+        """
+        if os.getenv("PROVISIONING_JOURNAL") != "true":
+            return None
+        return cls(Path(os.getenv("PROVISIONING_JOURNAL_DIR", DEFAULT_JOURNAL_DIR)),
+                   max_attempts=int(os.getenv("PROVISIONING_MAX_ATTEMPTS", "3")))
+
+    def _path(self, provisioning_id: str) -> Path:
+        return self.journal_dir / f"{provisioning_id}.json"
+
+    def _lock_path(self, provisioning_id: str) -> Path:
+        return self.journal_dir / f"{provisioning_id}.lock"
+
+    def load(self, provisioning_id: str) -> Dict[str, Any]:
+        return json.loads(self._path(provisioning_id).read_text(encoding="utf-8"))
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        record["updated"] = time.time()
+        path = self._path(record["id"])
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(record, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def _update(self, provisioning_id: str, **fields: Any) -> Dict[str, Any]:
+        with self._lock:
+            record = self.load(provisioning_id)
+            record.update(fields)
+            self._write(record)
+            return record
+
+    def begin(self) -> str:
+        """Создает и захватывает новую запись."""
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        provisioning_id = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self._claim(provisioning_id)
+        with self._lock:
+            self._write({"id": provisioning_id, "created": time.time(), "status": IN_PROGRESS, "steps": {},
+                         "error": None, "attempts": 1})
+        return provisioning_id
+
+    def record(self, provisioning_id: str, step: str, result: Any) -> None:
+        """Сохраняет результат выполненного шага."""
+        with self._lock:
+            record = self.load(provisioning_id)
+            record["steps"][step] = result
+            self._write(record)
+
+    def finish(self, provisioning_id: str) -> None:
+        self._update(provisioning_id, status=DONE, error=None)
+        self.release(provisioning_id)
+
+    def fail(self, provisioning_id: str, error: BaseException) -> None:
+        """Отмечает ошибку попытки; после max_attempts попыток запись помечается брошенной."""
+        record = self._update(provisioning_id, status=FAILED, error=f"{type(error).__name__}: {error}")
+        if record.get("attempts", 1) >= self.max_attempts:
+            self._abandon_exhausted(record)
+        self.release(provisioning_id)
+
+    def _abandon_exhausted(self, record: Dict[str, Any]) -> None:
+        self.abandon(record["id"])
+        logger.warning(f"Создание пользователя {record['id']} брошено после {record.get('attempts', 1)} попыток "
+                       f"(последняя ошибка: {record['error']}), выполненные шаги: "
+                       f"{', '.join(record['steps']) or 'нет'}.")
+
+    def abandon(self, provisioning_id: str) -> None:
+        """Помечает запись брошенной: она больше не продолжается, созданные на ней данные остаются в журнале."""
+        self._update(provisioning_id, status=ABANDONED)
+
+    def _claim(self, provisioning_id: str) -> bool:
+        """Захватывает запись lock-файлом; устаревший захват упавшего процесса снимается."""
+        lock_path = self._lock_path(provisioning_id)
+        try:
+            if time.time() - lock_path.stat().st_mtime > self.stale_after:
+                lock_path.unlink(missing_ok=True)
+        except FileNotFoundError:
+            pass
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return False
+        return True
+
+    def release(self, provisioning_id: str) -> None:
+        self._lock_path(provisioning_id).unlink(missing_ok=True)
+
+    @contextmanager
+    def locked(self, provisioning_id: str) -> Iterator[None]:
+        """
+        Захват записи без новой попытки: статус и счетчик попыток не меняются (например, для пометки брошенной).
+        """
+        if not self._claim(provisioning_id):
+            raise RuntimeError(f"Запись {provisioning_id} продолжает другой процесс")
+        try:
+            yield
+        finally:
+            self.release(provisioning_id)
+
+    def unfinished(self, include_abandoned: bool = False) -> List[Dict[str, Any]]:
+        """
+        Незавершенные записи: упавшие и брошенные в процессе (in_progress без обновлений дольше stale_after).
+        :param include_abandoned: Добавить записи, помеченные брошенными (на них остаются созданные данные).
+        """
+        if not self.journal_dir.is_dir():
+            return []
+        records = []
+        for path in sorted(self.journal_dir.glob("*.json")):
+            try:
+                record = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            stale = record["status"] == IN_PROGRESS and time.time() - record["updated"] > self.stale_after
+            if record["status"] == FAILED or stale or (include_abandoned and record["status"] == ABANDONED):
+                records.append(record)
+        return records
+
+    def resume_or_begin(self) -> Tuple[str, Dict[str, Any]]:
+        """
+        Захватывает самую старую незавершенную запись или создает новую.
+        :return: Идентификатор записи и результаты уже выполненных шагов.
+        """
+        for record in self.unfinished():
+            if not self._claim(record["id"]):
+                continue
+            if self.load(record["id"])["updated"] != record["updated"]:
+                self.release(record["id"])  # Запись изменилась после чтения: ее уже продолжил другой процесс
+                continue
+            if record.get("attempts", 1) >= self.max_attempts:
+                self._abandon_exhausted(record)  # Процесс упал на последней попытке
+                self.release(record["id"])
+                continue
+            record = self._update(record["id"], status=IN_PROGRESS, attempts=record.get("attempts", 1) + 1)
+            logger.info(f"Продолжаем создание пользователя {record['id']} (попытка {record['attempts']}), "
+                        f"выполнены шаги: {', '.join(record['steps']) or 'нет'}.")
+            return record["id"], record["steps"]
+        return self.begin(), {}
+
+    def claim(self, provisioning_id: str) -> Dict[str, Any]:
+        """
+        Захватывает указанную запись для продолжения.
+        :return: Результаты уже выполненных шагов.
+        """
+        if not self._claim(provisioning_id):
+            raise RuntimeError(f"Запись {provisioning_id} продолжает другой процесс")
+        if self.load(provisioning_id)["status"] == DONE:
+            self.release(provisioning_id)
+            raise RuntimeError(f"Запись {provisioning_id} уже завершена")
+        record = self.load(provisioning_id)
+        return self._update(provisioning_id, status=IN_PROGRESS, attempts=record.get("attempts", 1) + 1)["steps"]
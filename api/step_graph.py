@@ -0,0 +1,154 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger("API")
+
+
+class Step(NamedTuple):
+    """Шаг графа: функция получает результаты шагов inputs именованными аргументами и выполняется после шагов after."""
+    name: str
+    func: Callable[..., Any]
+    inputs: Tuple[str, ...]
+    after: Tuple[str, ...]
+
+    @property
+    def dependencies(self) -> Tuple[str, ...]:
+        return self.inputs + tuple(name for name in self.after if name not in self.inputs)
+
+
+class StepTiming(NamedTuple):
+    """Время шага относительно начала выполнения графа, сек."""
+    start: float
+    end: float
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+class StepGraph:
+    """
+    Граф зависимых шагов, выполняемый в пуле потоков: шаг запускается, как только выполнены все его зависимости,
+    поэтому независимые шаги выполняются одновременно. После выполнения доступны время каждого шага
+    и критический путь — цепочка шагов, определившая общее время.
+    Пример:
+        graph = StepGraph()
+        graph.add("crm", create_crm_user)
+        graph.add("way4", create_way4_user, inputs=("crm",))
+        results = graph.run()
+    """
+
+    def __init__(self):
+        self.steps: Dict[str, Step] = {}
+        self.timings: Dict[str, StepTiming] = {}
+        self.skipped: List[str] = []
+
+    def add(self, name: str, func: Callable[..., Any], inputs: Tuple[str, ...] = (),
+            after: Tuple[str, ...] = ()) -> "StepGraph":
+        """
+        Добавляет шаг.
+        :param name: Имя шага (оно же имя его результата).
+        :param func: Функция шага; результаты шагов inputs передаются ей аргументами с именами этих шагов.
+        :param inputs: Шаги, результаты которых нужны функции.
+        :param after: Шаги, которые должны завершиться раньше, но результаты которых не нужны.
+        """
+        if name in self.steps:
+            raise ValueError(f"Шаг {name} уже добавлен")
+        self.steps[name] = Step(name, func, tuple(inputs), tuple(after))
+        return self
+
+    def _validate(self) -> None:
+        for step in self.steps.values():
+            unknown = [name for name in step.dependencies if name not in self.steps]
+            if unknown:
+                raise ValueError(f"Шаг {step.name} зависит от неизвестных шагов: {', '.join(unknown)}")
+        visiting, done = set(), set()
+
+        def visit(name: str) -> None:
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Цикл зависимостей через шаг {name}")
+            visiting.add(name)
+            for dependency in self.steps[name].dependencies:
+                visit(dependency)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.steps:
+            visit(name)
+
+    def run(self, max_workers: int = 4, completed: Optional[Dict[str, Any]] = None,
+            on_step: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """
+        Выполняет граф.
+        :param max_workers: Количество потоков (1 — шаги выполняются последовательно в порядке добавления).
+        :param completed: Результаты шагов, выполненных ранее (например, в прерванной попытке): они не повторяются.
+        :param on_step: Вызывается после каждого успешного шага с его именем и результатом (в вызывающем потоке).
+        :return: Результаты шагов по именам.
+        При ошибке шага новые шаги не запускаются; после завершения уже запущенных ошибка пробрасывается дальше.
+        """
+        self._validate()
+        self.timings = {}
+        results: Dict[str, Any] = {name: value for name, value in (completed or {}).items() if name in self.steps}
+        pending = {name: step for name, step in self.steps.items() if name not in results}
+        self.skipped = list(results)
+        running: Dict[Future, str] = {}
+        started = time.perf_counter()
+        error: Optional[BaseException] = None
+
+        def call(step: Step) -> Any:
+            step_started = time.perf_counter() - started
+            try:
+                return step.func(**{name: results[name] for name in step.inputs})
+            finally:
+                self.timings[step.name] = StepTiming(step_started, time.perf_counter() - started)
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="step") as executor:
+            while pending or running:
+                if error is None:
+                    for name, step in list(pending.items()):
+                        if all(dependency in results for dependency in step.dependencies):
+                            running[executor.submit(call, step)] = name
+                            del pending[name]
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                        if on_step is not None:
+                            on_step(name, results[name])
+                    except Exception as e:
+                        logger.warning(f"Шаг {name} завершился ошибкой: {e}")
+                        error = error or e
+        if error is not None:
+            raise error
+        return results
+
+    def critical_path(self) -> List[str]:
+        """Шаги, определившие общее время: от последнего завершившегося шага по зависимостям, завершившимся позже всех."""
+        if not self.timings:
+            return []
+        path = [max(self.timings, key=lambda name: self.timings[name].end)]
+        while True:
+            dependencies = [name for name in self.steps[path[-1]].dependencies if name in self.timings]
+            if not dependencies:
+                return path[::-1]
+            path.append(max(dependencies, key=lambda name: self.timings[name].end))
+
+    def format_report(self) -> str:
+        """Время шагов в виде таблицы для лога; шаги критического пути отмечены звездочкой."""
+        critical = set(self.critical_path())
+        lines = [f"{'шаг':<28}{'старт, с':>10}{'время, с':>10}"]
+        for name, timing in sorted(self.timings.items(), key=lambda item: item[1].start):
+            mark = " *" if name in critical else ""
+            lines.append(f"{name:<28}{timing.start:>10.2f}{timing.duration:>10.2f}{mark}")
+        total = max(timing.end for timing in self.timings.values()) if self.timings else 0.0
+        lines.append(f"Общее время {total:.2f} с, критический путь: {' -> '.join(self.critical_path())}")
+        if self.skipped:
+            lines.append(f"Выполнены ранее: {', '.join(self.skipped)}")
+        return "\n".join(lines)
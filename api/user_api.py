@@ -1,7 +1,12 @@
 import logging
+import os
 import random
-from typing import Dict
-from requests import Response, request
+from typing import Dict, Optional
+
+from api.api_result import ApiResult
+from api.http_client import HttpClient
+from api.provisioning_journal import ProvisioningJournal
+from api.step_graph import StepGraph
 
 logger = logging.getLogger("API")
 
@@ -9,6 +14,7 @@ logger = logging.getLogger("API")
 class UserAPI:
     """
     Класс для управления созданием тестового пользователя через API.
+    Запросы выполняются через общий HttpClient: keep-alive соединения, таймауты и повторы идемпотентных шагов.
     """
     CRM_URL = "***"
     WAY4_URL = "***"
@@ -22,6 +28,10 @@ class UserAPI:
 
     USERNAME = "your_username"
     PASSWORD = "your_password"
+    # Пароль входа через банк для пользователей, созданных через API
+    TEST_USER_PASSWORD = "***"
+
+    client = HttpClient.from_env()
 
     @staticmethod
     def data_for_create_way4_user(user_crm=None):
@@ -107,7 +117,7 @@ class UserAPI:
         """
         data = {
                 "login": login,
-                "password": "***"
+                "password": UserAPI.TEST_USER_PASSWORD
             }
         return data
 
@@ -194,19 +204,15 @@ class UserAPI:
         :param data: Тело запроса;
         :param status_code: Ожидаемый ответ сервера;
         """
-        res = request(
-            method="POST",
-            url=url_api,
-            headers=header,
-            json=data
-        )
-        logger.info(f"POST: Создание клиента в CRM. Ответ: {res.status_code}")
-        logger.info(f"JSON ответа: {res.json()[0]}")
+        res = ApiResult(cls.client.request("POST", url_api, endpoint="create_crm_user",
+                                           headers=header, json=data), "create_crm_user")
+        logger.info("POST: Создание клиента в CRM. Ответ: %s", res.status_code)
+        res.log_body(logger)
         assert res.status_code == status_code
-        return res.json()[0]
+        return res.json[0]
 
     @classmethod
-    def create_way4_user(cls, url_api=WAY4_URL, header=None, data=None, status_code=200) -> Response:
+    def create_way4_user(cls, url_api=WAY4_URL, header=None, data=None, status_code=200) -> Dict:
         """
         Создание клиента в WAY4.
         :param url_api: URL версии API;
@@ -214,19 +220,15 @@ class UserAPI:
         :param data: Тело запроса;
         :param status_code: Ожидаемый ответ сервера;
         """
-        res = request(
-            method="POST",
-            url=url_api,
-            headers=header,
-            json=data
-        )
-        logger.info(f"POST: Создание клиента в WAY4. Ответ: {res.status_code}")
-        logger.info(f"JSON ответа: {res.json()}")
+        res = ApiResult(cls.client.request("POST", url_api, endpoint="create_way4_user",
+                                           headers=header, json=data), "create_way4_user")
+        logger.info("POST: Создание клиента в WAY4. Ответ: %s", res.status_code)
+        res.log_body(logger)
         assert res.status_code == status_code
-        return res.json()
+        return res.json
 
     @classmethod
-    def setting_way4_id_in_crm(cls, url_api=CRM_ADAPTER_URL, header=None, data=None, status_code=200) -> Response:
+    def setting_way4_id_in_crm(cls, url_api=CRM_ADAPTER_URL, header=None, data=None, status_code=200) -> Dict:
         """
         Проставление Way4Id в CRM.
         :param url_api: URL версии API;
@@ -234,19 +236,15 @@ class UserAPI:
         :param data: Тело запроса;
         :param status_code: Ожидаемый ответ сервера;
         """
-        res = request(
-            method="POST",
-            url=url_api,
-            headers=header,
-            json=data
-        )
-        logger.info(f"POST: Проставление Way4Id в CRM. Ответ: {res.status_code}")
-        logger.info(f"JSON ответа: {res.json()}")
+        res = ApiResult(cls.client.request("POST", url_api, endpoint="setting_way4_id_in_crm", idempotent=True,
+                                           headers=header, json=data), "setting_way4_id_in_crm")
+        logger.info("POST: Проставление Way4Id в CRM. Ответ: %s", res.status_code)
+        res.log_body(logger)
         assert res.status_code == status_code
-        return res.json()
+        return res.json
 
     @classmethod
-    def generate_biztalk_id(cls, url_api=BIZTALK_ID_URL, header=None, data=None, status_code=200) -> Response:
+    def generate_biztalk_id(cls, url_api=BIZTALK_ID_URL, header=None, data=None, status_code=200) -> Dict:
         """
         Генерация biztalkId.
         :param url_api: URL версии API;
@@ -254,20 +252,16 @@ class UserAPI:
         :param data: Тело запроса;
         :param status_code: Ожидаемый ответ сервера;
         """
-        res = request(
-            method="POST",
-            url=url_api,
-            headers=header,
-            json=data
-        )
-        logger.info(f"POST: Генерация biztalkId. Ответ: {res.status_code}")
-        logger.info(f"JSON ответа: {res.json()}")
+        res = ApiResult(cls.client.request("POST", url_api, endpoint="generate_biztalk_id",
+                                           headers=header, json=data), "generate_biztalk_id")
+        logger.info("POST: Генерация biztalkId. Ответ: %s", res.status_code)
+        res.log_body(logger)
         assert res.status_code == status_code
-        return res.json()
+        return res.json
 
     @classmethod
     def save_biztalk_id_way4(cls, url_api=SAVE_BIZTALK_ID_WAY4_URL, header=None, data=None,
-                             status_code=200) -> Response:
+                             status_code=200) -> Dict:
         """
         Сохранение biztalkId в Way4.
         :param url_api: URL версии API;
@@ -275,19 +269,15 @@ class UserAPI:
         :param data: Тело запроса;
         :param status_code: Ожидаемый ответ сервера;
         """
-        res = request(
-            method="POST",
-            url=url_api,
-            headers=header,
-            json=data
-        )
-        logger.info(f"POST: Сохранение biztalkId в Way4. Ответ: {res.status_code}")
-        logger.info(f"JSON ответа: {res.json()}")
+        res = ApiResult(cls.client.request("POST", url_api, endpoint="save_biztalk_id_way4", idempotent=True,
+                                           headers=header, json=data), "save_biztalk_id_way4")
+        logger.info("POST: Сохранение biztalkId в Way4. Ответ: %s", res.status_code)
+        res.log_body(logger)
         assert res.status_code == status_code
-        return res.json()
+        return res.json
 
     @classmethod
-    def save_biztalk_id_crm(cls, url_api=SAVE_BIZTALK_ID_CRM_URL, header=None, data=None, status_code=200) -> Response:
+    def save_biztalk_id_crm(cls, url_api=SAVE_BIZTALK_ID_CRM_URL, header=None, data=None, status_code=200) -> Dict:
         """
         Сохранение biztalkId в CRM.
         :param url_api: URL версии API;
@@ -295,16 +285,12 @@ class UserAPI:
         :param data: Тело запроса;
         :param status_code: Ожидаемый ответ сервера;
         """
-        res = request(
-            method="POST",
-            url=url_api,
-            headers=header,
-            json=data
-        )
-        logger.info(f"POST: Сохранение biztalkId в CRM. Ответ: {res.status_code}")
-        logger.info(f"JSON ответа: {res.json()}")
+        res = ApiResult(cls.client.request("POST", url_api, endpoint="save_biztalk_id_crm", idempotent=True,
+                                           headers=header, json=data), "save_biztalk_id_crm")
+        logger.info("POST: Сохранение biztalkId в CRM. Ответ: %s", res.status_code)
+        res.log_body(logger)
         assert res.status_code == status_code
-        return res.json()
+        return res.json
 
     @classmethod
     def issue_digital_card(cls, url_api=DIGITAL_CARD_URL, header=None, data=None, status_code=200) -> Dict:
@@ -315,19 +301,15 @@ class UserAPI:
         :param data: Тело запроса;
         :param status_code: Ожидаемый ответ сервера;
         """
-        res = request(
-            method="POST",
-            url=url_api,
-            headers=header,
-            json=data
-        )
-        logger.info(f"POST: Выпуск цифровой КЖ. Ответ: {res.status_code}")
-        logger.info(f"JSON ответа: {res.json()}")
+        res = ApiResult(cls.client.request("POST", url_api, endpoint="issue_digital_card",
+                                           headers=header, json=data), "issue_digital_card")
+        logger.info("POST: Выпуск цифровой КЖ. Ответ: %s", res.status_code)
+        res.log_body(logger)
         assert res.status_code == status_code
-        return res.json()
+        return res.json
 
     @classmethod
-    def get_info_by_card(cls, url_api=CARD_INFO_URL, header=None, data=None, status_code=200) -> Response:
+    def get_info_by_card(cls, url_api=CARD_INFO_URL, header=None, data=None, status_code=200) -> Dict:
         """
         Получение информации о карте.
         :param url_api: URL версии API;
@@ -335,34 +317,85 @@ class UserAPI:
         :param data: Тело запроса;
         :param status_code: Ожидаемый ответ сервера;
         """
-        res = request(
-            method="POST",
-            url=url_api,
-            headers=header,
-            json=data
-        )
-        logger.info(f"POST: Инфо о карте. Ответ: {res.status_code}")
-        logger.info(f"JSON ответа: {res.json()}")
+        res = ApiResult(cls.client.request("POST", url_api, endpoint="get_info_by_card", idempotent=True,
+                                           headers=header, json=data), "get_info_by_card")
+        logger.info("POST: Инфо о карте. Ответ: %s", res.status_code)
+        res.log_body(logger)
         assert res.status_code == status_code
-        return res.json()
+        return res.json
+
+    @classmethod
+    def provisioning_graph(cls) -> StepGraph:
+        """
+        Шаги создания пользователя с зависимостями по данным.
+        Генерация biztalkId не зависит от клиентов CRM и WAY4, а проставление Way4Id в CRM и сохранение
+        biztalkId в WAY4 и CRM не зависят друг от друга. Цифровая карта выпускается после всех связок.
+        """
+        graph = StepGraph()
+        graph.add("login", lambda: f"user{random.randint(1, 100000000000)}")
+        graph.add("user_crm", cls.create_crm_user)
+        graph.add("user_way4", lambda user_crm: cls.create_way4_user(
+            data=cls.data_for_create_way4_user(user_crm=user_crm)), inputs=("user_crm",))
+        graph.add("biztalk_id", lambda login: cls.generate_biztalk_id(
+            data=cls.data_for_generate_biztalk_id(login=login)), inputs=("login",))
+        graph.add("way4_id_in_crm", lambda user_crm, user_way4: cls.setting_way4_id_in_crm(
+            data=cls.data_for_setting_way4_id_in_crm(crm_id=str(user_crm["crm_id"]),
+                                                     way4_id=str(user_way4["result"]["client"]["way4Id"]))),
+                  inputs=("user_crm", "user_way4"))
+        graph.add("biztalk_id_in_way4", lambda user_way4, biztalk_id: cls.save_biztalk_id_way4(
+            data=cls.data_for_save_biztalk_id_in_way4(way4_id=str(user_way4["result"]["client"]["way4Id"]),
+                                                      biztalk_id=biztalk_id["result"])),
+                  inputs=("user_way4", "biztalk_id"))
+        graph.add("biztalk_id_in_crm", lambda user_crm, biztalk_id: cls.save_biztalk_id_crm(
+            data=cls.data_for_save_biztalk_id_in_crm(crm_id=str(user_crm["crm_id"]),
+                                                     biztalk_id=biztalk_id["result"])),
+                  inputs=("user_crm", "biztalk_id"))
+        graph.add("digital_card", lambda user_crm, user_way4: cls.issue_digital_card(
+            data=cls.data_for_issue_digital_card(way4_id=str(user_way4["result"]["client"]["way4Id"]),
+                                                 first_name=user_crm["first_name"], last_name=user_crm["last_name"],
+                                                 middle_name=user_crm["middle_name"])),
+                  inputs=("user_crm", "user_way4"), after=("way4_id_in_crm", "biztalk_id_in_way4", "biztalk_id_in_crm"))
+        graph.add("card_info", lambda digital_card: cls.get_info_by_card(
+            data=cls.data_for_get_info_by_card(card_id=digital_card["result"]["contract"]["card"]["id"])),
+                  inputs=("digital_card",))
+        return graph
+
+    @classmethod
+    def create_test_user(cls, journal: Optional[ProvisioningJournal] = None) -> Dict:
+        """
+        Создание пользователя: независимые API-запросы выполняются одновременно.
+        Количество потоков задается переменной окружения API_MAX_WORKERS (1 — последовательное выполнение).
+        Результаты шагов сохраняются в журнал: если предыдущая попытка оборвалась, создание продолжается
+        с первого невыполненного шага.
+        :param journal: Журнал создания пользователей (по умолчанию — из окружения).
+        """
+        journal = journal or ProvisioningJournal.from_env()
+        if journal is None:
+            return cls._provision()
+        provisioning_id, completed = journal.resume_or_begin()
+        return cls._provision(journal, provisioning_id, completed)
+
+    @classmethod
+    def resume_provisioning(cls, journal: ProvisioningJournal, provisioning_id: str) -> Dict:
+        """Завершение создания пользователя по записи журнала."""
+        return cls._provision(journal, provisioning_id, journal.claim(provisioning_id))
 
     @classmethod
-    def create_test_user(cls) -> Dict:
-        """Последовательное выполнение всех API-запросов для создания пользователя."""
-        user_crm = cls.create_crm_user()
-        user_way4 = cls.create_way4_user(data=cls.data_for_create_way4_user(user_crm=user_crm))
-        cls.setting_way4_id_in_crm(data=cls.data_for_setting_way4_id_in_crm(
-            crm_id=str(user_crm["crm_id"]), way4_id=str(user_way4["result"]["client"]["way4Id"])))
-        test_user_login = f"user{random.randint(1, 100000000000)}"
-        biztalk_id = cls.generate_biztalk_id(data=cls.data_for_generate_biztalk_id(login=test_user_login))
-        cls.save_biztalk_id_way4(data=cls.data_for_save_biztalk_id_in_way4(
-            way4_id=str(user_way4["result"]["client"]["way4Id"]), biztalk_id=biztalk_id["result"]))
-        cls.save_biztalk_id_crm(data=cls.data_for_save_biztalk_id_in_crm(
-            crm_id=str(user_crm["crm_id"]), biztalk_id=biztalk_id["result"]))
-        card_id = cls.issue_digital_card(data=cls.data_for_issue_digital_card(
-            way4_id=str(user_way4["result"]["client"]["way4Id"]), first_name=user_crm["first_name"],
-            last_name=user_crm["last_name"], middle_name=user_crm["middle_name"]))
-        card_info = cls.get_info_by_card(data=cls.data_for_get_info_by_card(
-            card_id=card_id["result"]["contract"]["card"]["id"]))
-        user_crm.update(card_info)
+    def _provision(cls, journal: Optional[ProvisioningJournal] = None, provisioning_id: Optional[str] = None,
+                   completed: Optional[Dict] = None) -> Dict:
+        graph = cls.provisioning_graph()
+        on_step = (lambda step, result: journal.record(provisioning_id, step, result)) if journal else None
+        try:
+            results = graph.run(max_workers=int(os.getenv("API_MAX_WORKERS", "4")), completed=completed,
+                                on_step=on_step)
+        except Exception as e:
+            if journal is not None:
+                journal.fail(provisioning_id, e)
+            raise
+        finally:
+            logger.info(f"Создание пользователя по шагам:\n{graph.format_report()}")
+        if journal is not None:
+            journal.finish(provisioning_id)
+        user_crm = dict(results["user_crm"])
+        user_crm.update(results["card_info"])
         return user_crm
@@ -6,6 +6,8 @@ pip install -r requirements.txt
 
 echo "Запуск тестов..."
 pytest tests/ \
+  -n auto \
+  --dist loadgroup \
   --testrail \
   --tr-no-ssl-cert-check \
   --tr-url="${TR_URL}" \
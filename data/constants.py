@@ -1,4 +1,5 @@
 """Константы, в т.ч. тексты ошибок и уведомлений."""
+import os
 
 
 class MainScreenNotice:
@@ -14,3 +15,12 @@ class MainScreenNotice:
     TEXT_CARD_ORDERED = "Карта заказана"
     TEXT_REQUEST_IS_PROCESSED = "Одобрена"
     TEXT_CARD_RESIDENT_TATARSTAN = "Карта жителя Татарстана"
+
+
+class DeepLinks:
+    """
+    Быстрые переходы на экраны приложения: диплинк (mobile: deepLink) или активити (mobile: startActivity).
+    Значения задаются переменными окружения; пустое значение — перехода нет, экран открывается кликами.
+    """
+    CARD_ISSUANCE = os.getenv("DEEPLINK_CARD_ISSUANCE", "")
+    CARD_ISSUANCE_ACTIVITY = os.getenv("ACTIVITY_CARD_ISSUANCE", "")
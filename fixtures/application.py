@@ -1,3 +1,4 @@
+from fixtures.navigator import Navigator
 from fixtures.screens.base_screen import BaseScreen
 from fixtures.screens.main_screen import MainScreen
 
@@ -12,3 +13,4 @@ class Application:
         self.driver = driver
         self.base = BaseScreen(driver)
         self.main = MainScreen(driver)
+        self.navigator = Navigator(self.main)
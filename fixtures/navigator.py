@@ -0,0 +1,237 @@
+import logging
+import time
+from typing import List, Optional, Tuple
+
+from data.constants import DeepLinks, MainScreenNotice as Notice
+from fixtures.screens.main_screen import MainScreen
+from utils.screen_graph import EdgeCosts, ScreenGraph
+
+logger = logging.getLogger("Карта Жителя")
+
+
+class Screens:
+    """Экраны графа навигации."""
+    HOME = "home"
+    CARD_TYPE = "card_type"
+    APPLY_CARD = "apply_card"
+    CITY_INPUT = "city_input"
+    ADDRESS_INPUT = "address_input"
+    RECEIPT = "receipt"
+    RECEIPT_COURIER = "receipt_courier"
+    RECEIPT_BANK = "receipt_bank"
+    SELECT_BANK_BRANCH = "select_bank_branch"
+    BANK_BRANCH_POPUP = "bank_branch_popup"
+    CARD_ORDERED = "card_ordered"
+    LOGIN = "login"
+
+
+class Navigator:
+    """
+    Навигация по графу экранов MainScreen.
+    Текущий экран распознается по снимку, дальше выполняется самый дешевый путь до нужного экрана: действия экранов,
+    «назад» или перезапуск приложения. Время каждого перехода уточняет его стоимость для следующих поисков пути.
+    Если после перехода открылся не тот экран, путь перестраивается от фактического экрана.
+    Пример:
+        app.navigator.go_to(Screens.RECEIPT_BANK)
+    """
+
+    # Штраф к стоимости перехода, который привел не на ожидаемый экран, сек
+    MISMATCH_PENALTY = 30.0
+
+    def __init__(self, main: MainScreen, costs: Optional[EdgeCosts] = None):
+        """
+        :param main: Главный экран приложения, действия которого образуют переходы графа.
+        :param costs: Стоимости переходов (по умолчанию — из файла SCREEN_COSTS_FILE).
+        """
+        self.main = main
+        self.graph = ScreenGraph(costs or EdgeCosts.from_env())
+        # Открыт ли на экране поиска 'Выдача карты' ввод адреса (см. _identify); сообщает MainScreen
+        self.address_input_open = False
+        main.on_search_screen = self._on_search_screen
+        self._build()
+
+    def _on_search_screen(self, address: Optional[bool]) -> None:
+        self.address_input_open = bool(address)
+
+    def _build(self) -> None:
+        main, graph = self.main, self.graph
+        # Экраны в порядке специфичности: распознается первый экран, все маркеры которого найдены
+        graph.add_node(Screens.CARD_ORDERED, (main.TEXT_CARD_ORDERED, Notice.TEXT_CARD_ORDERED))
+        graph.add_node(Screens.BANK_BRANCH_POPUP, (main.POPUP_BANK_BRANCH, None),
+                       (main.TEXT_UNIFIED_REFERENCE_SERVICE, None))
+        graph.add_node(Screens.SELECT_BANK_BRANCH, (main.TEXT_SELECT_BANK_BRANCH, Notice.TEXT_SELECT_BANK_BRANCH))
+        graph.add_node(Screens.RECEIPT_BANK, (main.TEXT_ADDRESS_OF_BANK_BRANCH, Notice.NOTICE_ADDRESS_OF_BANK_BRANCH))
+        graph.add_node(Screens.RECEIPT_COURIER,
+                       (main.TEXT_ADDRESS_TO_RECEIVE_CARD, Notice.NOTICE_ADDRESS_TO_RECEIVE_CARD))
+        graph.add_node(Screens.RECEIPT, (main.TEXT_RECEIPT, Notice.TEXT_RECEIPT))
+        graph.add_node(Screens.CITY_INPUT, (main.TEXT_CARD_ISSUANCE, Notice.TEXT_CARD_ISSUANCE),
+                       (main.FIELD_CITY, None))
+        # Экран ввода адреса выглядит так же, как экран ввода города, и по маркерам не распознается (первым
+        # совпадает CITY_INPUT): его отличает действие, которое открыло экран, см. _identify
+        graph.add_node(Screens.ADDRESS_INPUT, (main.TEXT_CARD_ISSUANCE, Notice.TEXT_CARD_ISSUANCE),
+                       (main.FIELD_CITY, None))
+        graph.add_node(Screens.CARD_TYPE, (main.TEXT_ORDER_RESIDENT_CARD, None))
+        graph.add_node(Screens.APPLY_CARD, (main.TEXT_APPLY_CARD, "Оформить карту"))
+        graph.add_node(Screens.HOME, (main.TEXT_ISSUE_CARD, main.HOME_BUTTON_TEXT))
+
+        # Переходы вперед — действия MainScreen; стоимость — начальная оценка в секундах
+        graph.add_edge(Screens.HOME, Screens.CARD_TYPE, "issue_card", main.issue_card, 3)
+        graph.add_edge(Screens.CARD_TYPE, Screens.APPLY_CARD, "issue_plastic_card", main.issue_plastic_card, 3)
+        graph.add_edge(Screens.APPLY_CARD, Screens.CITY_INPUT, "apply_plastic_card", main.apply_plastic_card, 3)
+        if DeepLinks.CARD_ISSUANCE or DeepLinks.CARD_ISSUANCE_ACTIVITY:
+            graph.add_edge(Screens.HOME, Screens.CITY_INPUT, "open_card_issuance", main.open_card_issuance, 4)
+        graph.add_edge(Screens.CITY_INPUT, Screens.RECEIPT, "input_delivery_city+select_delivery_option",
+                       lambda: (main.input_delivery_city(), main.select_delivery_option()), 8)
+        graph.add_edge(Screens.CITY_INPUT, Screens.RECEIPT_COURIER, "input_delivery_city+receive_card_by_courier",
+                       lambda: (main.input_delivery_city(), main.receive_card_by_courier()), 10)
+        graph.add_edge(Screens.CITY_INPUT, Screens.RECEIPT_BANK, "input_delivery_city+receive_card_from_bank",
+                       lambda: (main.input_delivery_city(), main.receive_card_from_bank()), 10)
+        for source in (Screens.RECEIPT, Screens.RECEIPT_BANK):
+            graph.add_edge(source, Screens.RECEIPT_COURIER, "click_by_courier",
+                           lambda: main.click(locator=main.BUTTON_BY_COURIER), 2)
+        for source in (Screens.RECEIPT, Screens.RECEIPT_COURIER):
+            graph.add_edge(source, Screens.RECEIPT_BANK, "click_by_bank",
+                           lambda: main.click(locator=main.BUTTON_BY_BANK), 2)
+        graph.add_edge(Screens.RECEIPT_BANK, Screens.SELECT_BANK_BRANCH, "click_select_address",
+                       lambda: main.click(locator=main.BUTTON_SELECT_ADDRESS), 3)
+        graph.add_edge(Screens.SELECT_BANK_BRANCH, Screens.BANK_BRANCH_POPUP, "click_first_bank_branch",
+                       lambda: main.click(locator=main.LINK_SELECT_FIRST_BANK_BRANCH), 3)
+        graph.add_edge(Screens.BANK_BRANCH_POPUP, Screens.RECEIPT_BANK, "click_confirm",
+                       lambda: main.click(locator=main.BUTTON_CONFIRM), 3)
+        graph.add_edge(Screens.RECEIPT_COURIER, Screens.ADDRESS_INPUT, "open_page_to_input_address",
+                       main.open_page_to_input_address, 3)
+        graph.add_edge(Screens.CARD_ORDERED, Screens.HOME, "return_to_home_screen", main.return_to_home_screen, 5)
+
+        # Переходы назад системной кнопкой
+        back_edges = ((Screens.CARD_TYPE, Screens.HOME), (Screens.APPLY_CARD, Screens.HOME),
+                      (Screens.CITY_INPUT, Screens.APPLY_CARD), (Screens.RECEIPT, Screens.CITY_INPUT),
+                      (Screens.RECEIPT_COURIER, Screens.CITY_INPUT), (Screens.RECEIPT_BANK, Screens.CITY_INPUT),
+                      (Screens.SELECT_BANK_BRANCH, Screens.RECEIPT_BANK),
+                      (Screens.BANK_BRANCH_POPUP, Screens.SELECT_BANK_BRANCH),
+                      (Screens.ADDRESS_INPUT, Screens.RECEIPT_COURIER))
+        for source, target in back_edges:
+            graph.add_edge(source, target, "press_back", main.press_back, 1.5)
+
+        # Перезапуск приложения — запасной путь на главный экран с любого экрана
+        for source in graph.nodes:
+            if source != Screens.HOME:
+                graph.add_edge(source, Screens.HOME, "restart_to_home", main.restart_to_home, 20)
+
+        # Экран входа распознается, но переходов с него нет: из него восстанавливается только полный вход
+        graph.add_node(Screens.LOGIN, (main.BUTTON_LOGIN_VIA_AK_BARS, None))
+
+    def classify(self, snapshot=None) -> Optional[str]:
+        """
+        Экран, открытый в приложении, по одному снимку иерархии без ожидания.
+        :param snapshot: Уже полученный снимок экрана (по умолчанию запрашивается новый).
+        :return: Имя экрана из Screens или None, если экран не распознан.
+        """
+        self.main.switch_to_native()
+        return self._identify(snapshot or self.main.snapshot(refresh=True))
+
+    def _identify(self, snapshot) -> Optional[str]:
+        """
+        Экран по снимку. Экран поиска 'Выдача карты' считается вводом адреса, если последним его открыл
+        переход к вводу адреса; на любом другом распознанном экране это состояние сбрасывается.
+        """
+        screen = self.graph.identify(snapshot)
+        if screen == Screens.CITY_INPUT:
+            return Screens.ADDRESS_INPUT if self.address_input_open else screen
+        if screen is not None:
+            self.address_input_open = False
+        return screen
+
+    def current_screen(self, wait_time=10) -> str:
+        """
+        Экран, открытый в приложении.
+        :param wait_time: Сколько ждать, пока экран станет распознаваемым (анимации, попапы).
+        """
+        self.main.switch_to_native()
+
+        def identified(_):
+            snapshot = self.main.snapshot(refresh=True)
+            screen = self._identify(snapshot)
+            if screen is None:
+                self.main.handle_interrupts(snapshot)
+            return screen
+
+        return self.main.wait_engine.until(self.main.driver, identified, wait_time,
+                                           message="Открытый экран не распознан", key="navigator: current_screen")
+
+    def path(self, source: str, target: str) -> List[str]:
+        """Названия переходов самого дешевого пути (для лога и отладки)."""
+        edges = self.graph.shortest_path(source, target)
+        return [f"{edge.name} -> {edge.target}" for edge in edges or []]
+
+    def path_cost(self, source: str, target: str) -> float:
+        """Оценка времени самого дешевого пути, сек (inf, если пути нет)."""
+        edges = self.graph.shortest_path(source, target)
+        return float("inf") if edges is None else sum(self.graph.costs.get(edge) for edge in edges)
+
+    def recover(self, targets: Tuple[str, ...] = (Screens.HOME,), wait_time=5) -> Optional[str]:
+        """
+        Возврат приложения в известное состояние после упавшего теста.
+        Экран определяется по снимку, дальше выполняется самый дешевый путь до ближайшего из экранов targets.
+        Нераспознанный экран (попап, экран вне графа) закрывается кнопкой «Назад» перед повторной попыткой.
+        :param targets: Допустимые экраны, в которые нужно вернуться.
+        :param wait_time: Сколько ждать распознавания экрана после «Назад».
+        :return: Экран, в который удалось вернуться, или None — тогда нужен сброс приложения.
+        """
+        try:
+            current = self.classify()
+            if current is None:
+                self.main.handle_interrupts()
+                self.main.press_back()
+                current = self.current_screen(wait_time)
+            target = min(targets, key=lambda name: self.path_cost(current, name))
+            if self.path_cost(current, target) == float("inf"):
+                logger.info(f"С экрана {current} нет пути на экраны {', '.join(targets)}.")
+                return None
+            logger.info(f"Восстановление с экрана {current} на экран {target}: {self.path(current, target)}")
+            self.go_to(target)
+            return target
+        except Exception as e:
+            logger.warning(f"Не удалось вернуть приложение в известное состояние: {e}")
+            return None
+
+    def confirm(self, screen: str) -> bool:
+        """
+        Проверка по новому снимку, что открыт именно экран screen (например, после recover перед тем, как
+        продолжить с него следующий тест).
+        """
+        try:
+            self.main.invalidate_screen_state()
+            return self.classify() == screen
+        except Exception as e:
+            logger.warning(f"Не удалось проверить экран {screen}: {e}")
+            return False
+
+    def go_to(self, target: str, max_steps: int = 12) -> None:
+        """
+        Переход на экран target с текущего экрана.
+        :param target: Экран из Screens.
+        :param max_steps: Максимальное количество переходов (с учетом перестроений пути).
+        """
+        current = self.current_screen()
+        steps = 0
+        try:
+            while current != target:
+                path = self.graph.shortest_path(current, target)
+                if not path:
+                    raise RuntimeError(f"Нет пути с экрана {current} на экран {target}")
+                steps += 1
+                if steps > max_steps:
+                    raise RuntimeError(f"Не удалось перейти на экран {target} за {max_steps} переходов")
+                edge = path[0]
+                logger.info(f"Навигация {current} -> {target}: {edge.name} -> {edge.target}")
+                started = time.monotonic()
+                edge.action()
+                current = self.current_screen()
+                elapsed = time.monotonic() - started
+                if current == edge.target:
+                    self.graph.costs.record(edge, elapsed)
+                else:
+                    logger.info(f"После {edge.name} открыт экран {current} вместо {edge.target}, перестраиваем путь.")
+                    self.graph.costs.record(edge, elapsed + self.MISMATCH_PENALTY)
+        finally:
+            self.graph.costs.save()
@@ -1,27 +1,258 @@
+import logging
+import os
 import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
 
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.actions.action_builder import ActionBuilder
-from selenium.webdriver.common.actions import interaction
-from selenium.webdriver.common.actions.pointer_input import PointerInput
+from selenium.common import (NoSuchElementException, StaleElementReferenceException, TimeoutException,
+                             UnknownMethodException, WebDriverException)
+from appium.webdriver.common.appiumby import AppiumBy
+from utils.action_batch import ActionBatch
+from utils.context_tracker import NATIVE_CONTEXT, ContextTracker
+from utils.element_cache import ElementCache
+from utils.interrupts import InterruptRegistry
+from utils.locator_compiler import compile_locator
+from utils.page_snapshot import PageSnapshot
+from utils.wait_engine import WaitEngine
+
+logger = logging.getLogger("Карта Жителя")
+
+# Фрагменты сообщений Appium о том, что драйвер не поддерживает команду (в т.ч. mobile:-расширение)
+UNSUPPORTED_COMMAND_MARKERS = ("unknown command", "unknown mobile command", "not yet been implemented",
+                               "not implemented", "is not supported")
+
+
+def field_text(element) -> str:
+    """Содержимое поля ввода: текст нативного поля или атрибут value поля в WebView (у input text пустой)."""
+    return element.text or element.get_attribute("value") or ""
+
+
+def value_entered(actual: Optional[str], expected: str) -> bool:
+    """
+    Совпадает ли содержимое поля с введенным значением.
+    Для чисел (телефон, код) поле может показывать значение с маской, поэтому сравниваются только цифры;
+    маска телефона может добавить перед номером код страны 7 или 8.
+    """
+    actual = actual or ""
+    if actual == expected:
+        return True
+    if expected.isdigit():
+        digits = "".join(char for char in actual if char.isdigit())
+        return digits == expected or (digits[:1] in ("7", "8") and digits[1:] == expected)
+    return False
 
 
 class BaseScreen:
     """
     Базовый класс для работы как с нативными элементами Android-приложения, так и с WebView.
     """
+    # Интервал проверки зарегистрированных попапов в обычном ожидании элемента, сек: каждая проверка — снимок экрана
+    INTERRUPT_CHECK_INTERVAL = 5
+    # Поле ввода, на котором стоит фокус
+    FOCUSED_INPUT = (AppiumBy.XPATH, '//android.widget.EditText[@focused="true"]')
+    # Количество попыток ввода и время ожидания значения в поле после каждой попытки, сек
+    INPUT_ATTEMPTS = 3
+    INPUT_VERIFY_TIMEOUT = 2
 
-    def __init__(self, driver):
+    def __init__(self, driver, wait_engine: Optional[WaitEngine] = None):
         """
         Инициализация базового экрана с передачей драйвера.
         :param driver: Драйвер для взаимодействия с приложением.
+        :param wait_engine: Механизм ожиданий (по умолчанию — экспоненциальный опрос с настройками из окружения).
         """
         self.driver = driver
         self.wait = WebDriverWait(driver, 10)
+        self.wait_engine = wait_engine or WaitEngine.from_env()
+        self.element_cache = ElementCache()
+        self._snapshot: Optional[PageSnapshot] = None
+        self.interrupts = InterruptRegistry()
+        self._context_generation = self.context.generation
+        self._handling_interrupt = False
+
+    def _wait_until(self, condition, locator, wait_time):
+        """
+        Ожидание условия для локатора через механизм ожиданий экрана.
+        Пока условие не выполнено, зарегистрированные попапы проверяются не чаще раза в INTERRUPT_CHECK_INTERVAL
+        секунд: проверка требует снимка экрана, а быстрые ожидания завершаются без него.
+        :param condition: Условие из expected_conditions.
+        :param locator: Локатор элемента (используется в сообщении об ошибке и статистике).
+        :param wait_time: Время ожидания.
+        """
+        next_check = time.monotonic() + self.INTERRUPT_CHECK_INTERVAL
+
+        def condition_with_interrupts(driver):
+            nonlocal next_check
+            try:
+                value = condition(driver)
+            except NoSuchElementException:
+                value = None
+            if not value and self.interrupts and time.monotonic() >= next_check:
+                self.handle_interrupts()
+                next_check = time.monotonic() + self.INTERRUPT_CHECK_INTERVAL
+            return value
+
+        return self.wait_engine.until(self.driver, condition_with_interrupts, wait_time,
+                                      message=f"Невозможно найти элемент по локатору: {locator}",
+                                      key=str(locator))
+
+    def register_interrupt(self, name: str, locator, handler):
+        """
+        Регистрация попапа, который закрывается автоматически во время ожиданий экрана.
+        :param name: Имя попапа для лога.
+        :param locator: Локатор нативного элемента, по которому попап распознается.
+        :param handler: Функция без аргументов, закрывающая попап.
+        """
+        self.interrupts.register(name, locator, handler)
+
+    def handle_interrupts(self, snapshot: Optional[PageSnapshot] = None,
+                          exclude: Sequence[Tuple[str, str]] = ()) -> Optional[str]:
+        """
+        Закрывает зарегистрированный попап, если он есть на экране.
+        Проверка выполняется только в нативном контексте и не запускается повторно из обработчика попапа.
+        :param snapshot: Уже полученный снимок экрана (по умолчанию запрашивается новый).
+        :param exclude: Локаторы попапов, которые не закрываются (их ожидает вызывающий код).
+        :return: Имя закрытого попапа или None.
+        """
+        if not self.interrupts or self._handling_interrupt or not self.context.is_native:
+            return None
+        self._handling_interrupt = True
+        try:
+            name = self.interrupts.handle(snapshot or self.snapshot(refresh=True), exclude)
+        except Exception as e:
+            logger.warning(f"Ошибка при проверке попапов: {e}")
+            name = None
+        finally:
+            self._handling_interrupt = False
+        if name is not None:
+            self.invalidate_screen_state()
+        return name
+
+    def _present(self, snapshot: PageSnapshot, locator) -> bool:
+        """Есть ли элемент на снимке; локаторы, которые снимок не поддерживает, ищутся на устройстве."""
+        try:
+            return snapshot.exists(locator)
+        except ValueError:
+            return bool(self.driver.find_elements(*locator))
+
+    def wait_for_any(self, locators: Sequence[Tuple[str, str]], wait_time=20,
+                     texts: Optional[Dict[Tuple[str, str], str]] = None) -> Tuple[str, str]:
+        """
+        Ожидание первого появившегося элемента из нескольких (например, главный экран или один из попапов).
+        Все локаторы проверяются по одному снимку экрана за опрос, поэтому ожидание завершается, как только
+        появляется любой из них, без таймаутов на отсутствующие элементы.
+        Зарегистрированные попапы, которых нет среди ожидаемых локаторов, закрываются до проверки локаторов:
+        элемент экрана под попапом остается в иерархии и иначе считался бы найденным.
+        :param locators: Локаторы нативных элементов в порядке приоритета.
+        :param wait_time: Время ожидания.
+        :param texts: Ожидаемый текст для локаторов, которые без текста не отличают экран (общая кнопка и т.п.).
+        :return: Локатор найденного элемента.
+        """
+        locators: List[Tuple[str, str]] = list(locators)
+        texts = texts or {}
+
+        def any_present(driver):
+            snapshot = self.snapshot(refresh=True)
+            if self.handle_interrupts(snapshot, exclude=locators) is not None:
+                snapshot = self.snapshot(refresh=True)
+            for locator in locators:
+                if locator in texts:
+                    if snapshot.text(locator) == texts[locator]:
+                        return locator
+                elif self._present(snapshot, locator):
+                    return locator
+            return None
+
+        return self.wait_engine.until(self.driver, any_present, wait_time,
+                                      message=f"Не найден ни один из элементов: {locators}",
+                                      key="any: " + " | ".join(str(locator) for locator in locators))
 
     # ==== Методы работы с нативными элементами ====
 
+    def _cached_element(self, locator, wait_time, condition, check=None):
+        """
+        Элемент из кеша экрана или, при промахе, поиск с ожиданием и сохранение в кеш.
+        :param locator: Локатор элемента.
+        :param wait_time: Время ожидания при поиске.
+        :param condition: Условие ожидания из expected_conditions, принимающее локатор.
+        :param check: Дополнительная проверка закешированного элемента (например, видимость).
+        """
+        self._sync_context()
+        element = self.element_cache.get(locator)
+        if element is not None:
+            try:
+                if check is None or check(element):
+                    return element
+            except StaleElementReferenceException:
+                self.element_cache.discard_stale(locator)
+        compiled = compile_locator(locator)
+        try:
+            element = self._wait_until(condition(compiled.primary), locator, wait_time)
+        except TimeoutException:
+            if compiled.fallback is None:
+                raise
+            # Быстрый локатор не нашел элемент — одна проверка исходным XPath на случай неэквивалентной компиляции
+            element = self._wait_until(condition(compiled.fallback), locator, 0)
+        self.element_cache.put(locator, element)
+        return element
+
+    def _on_element(self, locator, action, wait_time=20, visible=False):
+        """
+        Выполняет действие над элементом из кеша. Если ссылка на элемент устарела, элемент ищется заново.
+        :param locator: Локатор элемента.
+        :param action: Функция, принимающая WebElement.
+        :param wait_time: Время ожидания при поиске.
+        :param visible: Ждать видимости элемента, а не только его присутствия.
+        """
+        for attempt in range(2):
+            element = self._visibility_element(locator, wait_time) if visible else self._find_element(locator, wait_time)
+            try:
+                return action(element)
+            except StaleElementReferenceException:
+                if attempt:
+                    raise
+                self.element_cache.discard_stale(locator)
+
+    def invalidate_screen_state(self):
+        """Сброс закешированного состояния экрана после действий, которые могут его изменить."""
+        self.element_cache.invalidate()
+        self._snapshot = None
+
+    def snapshot(self, refresh=False) -> PageSnapshot:
+        """
+        Снимок иерархии текущего нативного экрана. Повторно запрашивается только после действий,
+        меняющих экран, или при refresh=True.
+        :param refresh: Принудительно получить новый снимок.
+        """
+        self._sync_context()
+        if self._snapshot is None or refresh:
+            self._snapshot = PageSnapshot(self.driver.page_source)
+        return self._snapshot
+
+    def get_text_from_snapshot(self, locator, wait_time=20):
+        """
+        Получение текста элемента из снимка экрана без отдельного запроса к устройству.
+        Если к моменту снимка элемент еще не отрисован, элемент дожидается и читается напрямую.
+        :param locator: Локатор элемента (AppiumBy.XPATH или AppiumBy.ID).
+        :param wait_time: Время ожидания, если элемента нет в снимке.
+        :return: Текст элемента.
+        """
+        text = self.snapshot().text(locator)
+        if text is None:
+            self._snapshot = None
+            return self.get_text(locator, wait_time)
+        return text
+
+    def get_texts_from_snapshot(self, *locators, wait_time=20):
+        """
+        Тексты нескольких элементов по одному снимку экрана.
+        :param locators: Локаторы элементов.
+        :param wait_time: Время ожидания для элементов, которых нет в снимке.
+        :return: Список текстов в порядке локаторов.
+        """
+        return [self.get_text_from_snapshot(locator, wait_time) for locator in locators]
+
     def _find_element(self, locator, wait_time=20):
         """
         Поиск элемента с ожиданием.
@@ -29,9 +260,7 @@ class BaseScreen:
         :param wait_time: Время ожидания.
         :return: Найденный элемент.
         """
-        element = WebDriverWait(self.driver, wait_time).until(
-            EC.presence_of_element_located(locator), message=f"Невозможно найти элемент по локатору: {locator}")
-        return element
+        return self._cached_element(locator, wait_time, EC.presence_of_element_located)
 
     def _visibility_element(self, locator, wait_time=20):
         """
@@ -40,9 +269,8 @@ class BaseScreen:
         :param wait_time: Время ожидания.
         :return: Найденный элемент.
         """
-        element = WebDriverWait(self.driver, wait_time).until(
-            EC.visibility_of_element_located(locator), message=f"Невозможно найти элемент по локатору: {locator}")
-        return element
+        return self._cached_element(locator, wait_time, EC.visibility_of_element_located,
+                                    check=lambda element: element.is_displayed())
 
     def element_is_enabled(self, locator, wait_time=20):
         """
@@ -50,8 +278,7 @@ class BaseScreen:
         :param locator: Локатор элемента.
         :param wait_time: Время ожидания перед поиском элемента.
         """
-        element = self._visibility_element(locator, wait_time)
-        element.is_enabled()
+        self._on_element(locator, lambda element: element.is_enabled(), wait_time, visible=True)
 
     def click(self, locator, wait_time=20):
         """
@@ -59,23 +286,96 @@ class BaseScreen:
         :param locator: Локатор элемента.
         :param wait_time: Время ожидания перед поиском элемента.
         """
-        element = self._find_element(locator, wait_time)
-        element.click()
+        try:
+            self._on_element(locator, lambda element: element.click(), wait_time)
+        finally:
+            self.invalidate_screen_state()
 
     def send_keys(self, locator, value: str, wait_time=20, delay=0):
         """
         Ввод текста в поле ввода.
+        Значение устанавливается одним вызовом, затем проверяется содержимое поля; ввод повторяется,
+        только если поле содержит не то значение (фронт потерял символы или вернул прежнее значение).
         :param locator: Локатор элемента.
         :param value: Текст для ввода.
         :param wait_time: Время ожидания перед поиском элемента.
-        :param delay: Время задержки между очисткой поля и вводом значения. Необходим когда поле пред заполнено каким-то
-        значением и фронт возвращает его в поле после send_keys.
+        :param delay: Максимальное время, за которое поле должно перестать меняться до и после очистки. Необходим когда
+        поле пред заполнено каким-то значением и фронт возвращает его в поле после send_keys.
         """
         element = self._find_element(locator, wait_time)
-        time.sleep(delay)
-        element.clear()
-        time.sleep(delay)
-        element.send_keys(value)
+        try:
+            for attempt in range(1, self.INPUT_ATTEMPTS + 1):
+                if delay:
+                    self._wait_field_stable(element, locator, delay)
+                element.clear()
+                if delay:
+                    self._wait_field_stable(element, locator, delay)
+                element.send_keys(value)
+                if self._wait_value(element, value, locator):
+                    return
+                logger.warning(f"Поле {locator} содержит '{field_text(element)}' вместо '{value}', попытка {attempt}.")
+            raise AssertionError(f"Не удалось ввести '{value}' в поле {locator}")
+        finally:
+            self.invalidate_screen_state()
+
+    def type_into_focused(self, value: str, wait_time=20):
+        """
+        Быстрый ввод текста в поле, на котором стоит фокус (например, поле телефона на странице входа банка).
+        Вместо посимвольного ввода с паузами текст передается одной командой 'mobile: type', затем проверяется
+        содержимое поля; ввод повторяется, только если символы потерялись.
+        :param value: Текст для ввода.
+        :param wait_time: Время ожидания поля с фокусом.
+        """
+        element = self._wait_until(EC.presence_of_element_located(self.FOCUSED_INPUT), self.FOCUSED_INPUT, wait_time)
+        try:
+            for attempt in range(1, self.INPUT_ATTEMPTS + 1):
+                if attempt > 1:
+                    element.clear()
+                try:
+                    self.driver.execute_script("mobile: type", {"text": value})
+                except WebDriverException as e:
+                    if not self._unsupported_command(e):
+                        raise
+                    # Драйвер без 'mobile: type' — весь текст одной последовательностью клавиш
+                    self.actions().keys(value).perform()
+                if self._wait_value(element, value, self.FOCUSED_INPUT):
+                    return
+                logger.warning(f"Поле ввода содержит '{field_text(element)}' вместо '{value}', попытка {attempt}.")
+            raise AssertionError(f"Не удалось ввести '{value}' в поле с фокусом")
+        finally:
+            self.invalidate_screen_state()
+
+    @staticmethod
+    def _unsupported_command(error: WebDriverException) -> bool:
+        """Ошибка означает, что драйвер не поддерживает команду ('unknown command', 'Unknown mobile command')."""
+        if isinstance(error, UnknownMethodException):
+            return True
+        message = (error.msg or "").lower()
+        return any(marker in message for marker in UNSUPPORTED_COMMAND_MARKERS)
+
+    def _wait_field_stable(self, element, locator, timeout):
+        """Ожидание, пока текст поля перестанет меняться (две одинаковые проверки подряд)."""
+        last_text = [None]
+
+        def stable(_):
+            text = field_text(element)
+            settled = text == last_text[0]
+            last_text[0] = text
+            return settled
+
+        try:
+            self.wait_engine.until(self.driver, stable, timeout, key=f"stable: {locator}")
+        except TimeoutException:
+            logger.info(f"Поле {locator} продолжает меняться после {timeout} сек, продолжаем ввод.")
+
+    def _wait_value(self, element, value: str, locator) -> bool:
+        """Ожидание, что поле содержит введенное значение."""
+        try:
+            self.wait_engine.until(self.driver, lambda _: value_entered(field_text(element), value),
+                                   self.INPUT_VERIFY_TIMEOUT, key=f"value: {locator}")
+            return True
+        except TimeoutException:
+            return False
 
     def get_text(self, locator, wait_time=20):
         """
@@ -84,50 +384,95 @@ class BaseScreen:
         :param wait_time: Время ожидания перед поиском элемента.
         :return: Текст элемента.
         """
-        element = self._find_element(locator, wait_time)
-        return element.text
+        return self._on_element(locator, lambda element: element.text, wait_time)
+
+    def press_back(self):
+        """Нажатие системной кнопки «Назад»."""
+        try:
+            self.driver.press_keycode(4)  # Android keycode "назад"
+        finally:
+            self.invalidate_screen_state()
+
+    def actions(self, wait_time=20) -> ActionBatch:
+        """
+        Пакет касаний, свайпов и нажатий клавиш, отправляемый одним perform.
+        :param wait_time: Время ожидания элементов, по которым определяются координаты касаний.
+        """
+        return ActionBatch(self.driver, lambda locator: self._visibility_element(locator, wait_time),
+                           on_perform=self.invalidate_screen_state)
 
     def swipe_to_refresh(self):
         """Функция для выполнения свайпа вниз для обновления экрана."""
         size = self.driver.get_window_size()
-        width = size['width']
-        height = size['height']
-        start_x = width // 2
-        start_y = int(height * 0.1)
-        end_y = int(height * 0.5)
-
-        action = ActionBuilder(self.driver, PointerInput(interaction.POINTER_TOUCH, "touch"))
-        action.pointer_action.move_to_location(start_x, start_y)
-        action.pointer_action.pointer_down()
-        action.pointer_action.pause(0.5)
-        action.pointer_action.move_to_location(start_x, end_y)
-        action.pointer_action.pointer_up()
-        action.perform()
+        start_x = size['width'] // 2
+        start_y = int(size['height'] * 0.1)
+        end_y = int(size['height'] * 0.5)
+        self.actions().swipe((start_x, start_y), (start_x, end_y)).perform()
 
     # ==== Методы работы с WebView ====
 
+    @property
+    def context(self) -> ContextTracker:
+        """Трекер контекста драйвера, общий для всех экранов приложения."""
+        return ContextTracker.for_driver(self.driver)
+
+    def _sync_context(self):
+        """Сброс закешированного состояния экрана, если с прошлого обращения контекст переключался."""
+        generation = self.context.generation
+        if generation != self._context_generation:
+            self._context_generation = generation
+            self.invalidate_screen_state()
+
+    def _switch_context(self, name: str):
+        if self.context.switch(name):
+            self._sync_context()
+
     def switch_to_webview(self):
         """
         Переключение на WebView-контекст.
         Сначала пытается переключиться на 'WEBVIEW_chrome', если он доступен.
-        Если его нет, переключается на первый найденный WebView.
+        Если его нет, переключается на первый найденный WebView. Если драйвер уже в этом WebView, запрос не выполняется.
         """
-        web_views = [context for context in self.driver.contexts if "WEBVIEW" in context]
-        if not web_views:
-            raise RuntimeError("WebView не найдено!")
-        if "WEBVIEW_chrome" in web_views:  # Если 'WEBVIEW_chrome' есть в списке, переключаемся на него
-            self.driver.switch_to.context("WEBVIEW_chrome")
-        else:
-            self.driver.switch_to.context(web_views[0])  # Если 'WEBVIEW_chrome' нет, переключаемся на первый доступный
+        self._switch_context(self.context.webview_name())
 
     def switch_to_native(self):
-        """Переключение обратно на нативный контекст приложения."""
-        self.driver.switch_to.context("NATIVE_APP")
+        """Переключение обратно на нативный контекст приложения (без запроса, если драйвер уже в нем)."""
+        self._switch_context(NATIVE_CONTEXT)
+
+    def warm_up_webview(self) -> bool:
+        """
+        Ранний запуск chromedriver: если WebView уже открыт, подключается к нему и возвращается в текущий контекст.
+        Вызывается, пока тест ждет что-то другое (например, код подтверждения). Отключается WEBVIEW_WARMUP=false.
+        Ошибка прогрева не прерывает тест: WebView будет подключен по требованию.
+        :return: True, если прогрев выполнен.
+        """
+        if os.getenv("WEBVIEW_WARMUP", "true") != "true":
+            return False
+        try:
+            warmed_up = self.context.warm_up()
+        except Exception as e:
+            logger.warning(f"Не удалось прогреть WebView: {e}")
+            return False
+        finally:
+            self._sync_context()
+        return warmed_up
+
+    @contextmanager
+    def webview(self):
+        """
+        Блок работы с WebView: переключение в WebView на входе и возврат в исходный контекст на выходе.
+            with self.webview():
+                self.click(locator=self.LOGIN_BY_PASSWORD)
+        """
+        previous = self.context.current
+        self.switch_to_webview()
+        try:
+            yield self
+        finally:
+            self._switch_context(previous)
 
     def find_webview_element(self, locator, wait_time=20):
-        element = WebDriverWait(self.driver, wait_time).until(
-            EC.presence_of_element_located(locator), message=f"Невозможно найти элемент по локатору: {locator}")
-        return element
+        return self._wait_until(EC.presence_of_element_located(locator), locator, wait_time)
 
     def click_webview_element(self, locator: tuple):
         """Клик по элементу в WebView."""
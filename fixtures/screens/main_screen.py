@@ -1,14 +1,15 @@
-import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
 
 from selenium.webdriver.common.by import By
 from appium.webdriver.common.appiumby import AppiumBy
 from selenium.webdriver.common.keys import Keys
-from selenium.common import NoSuchElementException, TimeoutException
+from selenium.common import TimeoutException
 from fixtures.screens.base_screen import BaseScreen
-from selenium.webdriver.common.action_chains import ActionChains
 from helper.otp_provider_helper import OTPRequestHelper
-from data.constants import MainScreenNotice as Notice
+from data.constants import DeepLinks, MainScreenNotice as Notice
+from utils.login_state_cache import LoginStateCache, app_id
 
 logger = logging.getLogger("Карта Жителя")
 
@@ -23,15 +24,19 @@ class MainScreen(BaseScreen):
     TEXT_SKIP = (By.XPATH, "//p[contains(text(), 'Пропустить')]")
     TEXT_ADD_CODE = (AppiumBy.XPATH, '//android.widget.TextView[@resource-id="*****:id/titleView"]')
     TEXT_PAY_PARKING = (AppiumBy.XPATH, '//android.widget.TextView[contains(@text, "Оплата парковок")]')
-    TEXT_ISSUE_CARD = (AppiumBy.XPATH, '//android.widget.TextView[@resource-id="*****:id/text"]')
+    # Текст основной кнопки экрана ("Выпустить карту", "Оформить карту", "Далее") — один локатор на все экраны
+    TEXT_PRIMARY_BUTTON = (AppiumBy.XPATH, '//android.widget.TextView[@resource-id="*****:id/text"]')
+    TEXT_ISSUE_CARD = TEXT_PRIMARY_BUTTON
+    # Текст основной кнопки главного экрана авторизованного пользователя
+    HOME_BUTTON_TEXT = "Выпустить карту"
     TEXT_ORDER_RESIDENT_CARD = (
         AppiumBy.XPATH,
         '//android.widget.TextView[@resource-id="*****:id/tv_header_choose_card_type"]')
-    TEXT_APPLY_CARD = (AppiumBy.XPATH, '//android.widget.TextView[@resource-id="*****:id/text"]')
+    TEXT_APPLY_CARD = TEXT_PRIMARY_BUTTON
     TEXT_CARD_ISSUANCE = (AppiumBy.XPATH, '//android.widget.TextView[@text="Выдача карты"]')
     TEXT_CITY_IN_LIST = (
         AppiumBy.XPATH, '//android.widget.TextView[@resource-id="*****:id/tv_main_row_item"]')
-    TEXT_NEXT_BUTTON = (AppiumBy.XPATH, '//android.widget.TextView[@resource-id="*****:id/text"]')
+    TEXT_NEXT_BUTTON = TEXT_PRIMARY_BUTTON
     TEXT_RECEIPT = (AppiumBy.XPATH, '//android.widget.TextView[@resource-id="*****:'
                                     'id/kit_title_check_box"]')
     TEXT_ADDRESS_TO_RECEIVE_CARD = (AppiumBy.XPATH, '//android.widget.TextView[@resource-id="*****:'
@@ -94,93 +99,212 @@ class MainScreen(BaseScreen):
     POPUP_BANK_BRANCH = (AppiumBy.XPATH, '//android.widget.FrameLayout[@resource-id="*****:'
                                          'id/design_bottom_sheet"]/android.widget.LinearLayout')
 
-    def check_and_close_update_popup(self):
-        """Метод проверки появления и закрытия WebView и нативных попапов."""
-        try:
-            logger.info("Ищем окно обновления приложения.")
-            update_popup = self._find_element(locator=self.TEXT_UPDATE_APP)
-            if update_popup:
-                logger.info("Найдено окно обновления приложения, закрываем его.")
-                self.click(locator=self.BUTTON_CLOSE)
-                logger.info("Окно обновления приложения закрыто, продолжаем тест.")
-                return  # Попап найден и закрыт, продолжаем тест
-
-        except (NoSuchElementException, TimeoutException):
-            logger.info("Окно обновления приложения не найдено. Пытаемся закрыть WebView.")
-
-        # Если TEXT_UPDATE_APP не найден, пробуем закрыть WebView кнопкой "назад"
+    # Быстрые переходы, которые не сработали в этом прогоне
+    _failed_shortcuts = set()
+
+    def __init__(self, driver, wait_engine=None):
+        super().__init__(driver, wait_engine)
+        self.register_interrupt("Обновите приложение", self.TEXT_UPDATE_APP, self._close_popup)
+        self.register_interrupt("Оплата парковок в Карте жителя", self.TEXT_PAY_PARKING, self._close_popup)
+        # Получатель сведений об открытом варианте экрана поиска (навигатор)
+        self.on_search_screen: Optional[Callable[[Optional[bool]], None]] = None
+
+    def _close_popup(self):
+        """Закрытие нативного попапа крестиком."""
+        self.click(locator=self.BUTTON_CLOSE)
+
+    def check_and_close_update_popup(self, wait_time=20):
+        """
+        Метод проверки появления и закрытия WebView и нативных попапов.
+        Ожидает окно обновления приложения или кнопку авторизации главного экрана; окно обновления закрывается.
+        Если не появилось ни то, ни другое, экран перекрыт WebView — закрываем его кнопкой "назад" и ждем еще раз.
+        :param wait_time: Время ожидания главного экрана.
+        """
+        logger.info("Ожидаем главный экран или окно обновления приложения.")
+        if self._close_update_popup_or_wait_home(wait_time):
+            return
+        logger.info("Главный экран не найден. Пытаемся закрыть WebView.")
+
         try:
-            self.driver.press_keycode(4)  # Android keycode "назад"
+            self.press_back()
             logger.info("Нажали кнопку 'назад' для выхода из WebView.")
         except Exception as e:
             logger.warning(f"Ошибка при попытке закрытия WebView: {e}")
 
-        # Повторно проверяем наличие попапа
-        try:
-            logger.info("Повторно ищем окно обновления приложения после закрытия WebView.")
-            update_popup = self._find_element(locator=self.TEXT_UPDATE_APP)
-            if update_popup:
-                logger.info("Найдено окно обновления приложения после закрытия WebView. Закрываем его.")
-                self.click(locator=self.BUTTON_CLOSE)
-                logger.info("Окно обновления приложения закрыто, продолжаем тест.")
-            else:
-                logger.info("Окно обновления приложения не найдено после закрытия WebView. Продолжаем тест.")
+        if not self._close_update_popup_or_wait_home(wait_time):
+            logger.info("Главный экран не найден после попытки закрыть WebView. Продолжаем тест.")
 
-        except (NoSuchElementException, TimeoutException):
-            logger.info("Окно обновления приложения не найдено после попытки закрыть WebView. Продолжаем тест.")
+    def _close_update_popup_or_wait_home(self, wait_time=20) -> bool:
+        """
+        Ожидание окна обновления приложения или главного экрана; окно обновления закрывается крестиком.
+        :return: False, если не появилось ни то, ни другое.
+        """
+        try:
+            found = self.wait_for_any([self.TEXT_UPDATE_APP, self.BUTTON_LOGIN_VIA_AK_BARS], wait_time)
+        except TimeoutException:
+            return False
+        if found == self.TEXT_UPDATE_APP:
+            logger.info("Найдено окно обновления приложения, закрываем его.")
+            self._close_popup()
+            logger.info("Окно обновления приложения закрыто, продолжаем тест.")
+        else:
+            logger.info("Главный экран открыт, продолжаем тест.")
+        return True
 
     def assert_home_screen_is_open(self):
         """Проверка, что открыт главный экран приложения и кнопка 'Войти через Ак Барс Банк' доступна."""
         button = self.get_text(locator=self.BUTTON_LOGIN_VIA_AK_BARS)
         logger.info(f"Кнопка авторизации '{button}' найдена")
 
-    def login_via_phone(self, phone: str = "123456789", password: str = "123456789", delay=4):
+    def login_via_phone(self, phone: str = "123456789", password: str = "123456789", wait_time=20):
         """
         Авторизация в приложении через Ак Барс Банк по номеру телефона и кодом подтверждения.
         :param phone: Номер моб телефона тестового пользователя
         :param password: Пароль тестового пользователя, у всех одинаковый: 123456789
+        :param wait_time: Время ожидания поля ввода телефона на странице входа банка
         """
         self.element_is_enabled(locator=self.BUTTON_LOGIN_VIA_AK_BARS)  # Ожидание элемента
         self.click(locator=self.BUTTON_LOGIN_VIA_AK_BARS)
-        actions = ActionChains(self.driver)
-        time.sleep(delay)
-        for char in phone:
-            actions.send_keys(char).perform()
-            time.sleep(0.1)  # Задержка т.к. эмулятор обрабатывает быстрый ввод как один блок и пропускает символы
-        actions.send_keys(Keys.ENTER).perform()  # Имитация нажатия Enter
+        # Ждем поле телефона с фокусом и вводим номер одной командой с проверкой: эмулятор теряет символы
+        # при быстром посимвольном вводе, поэтому ввод повторяется, если номер в поле не совпал
+        self.type_into_focused(phone, wait_time=wait_time)
+        self.actions().keys(Keys.ENTER).perform()  # Имитация нажатия Enter
 
+        # Код подтверждения запрашивается из API в фоне, а пока его ждем, прогреваем WebView страницы входа банка
         otp_helper = OTPRequestHelper(phone=phone)
-        otp_code = otp_helper.get_notifications().get_login_code()  # Получаем код подтверждения из API
-        actions.send_keys(otp_code).perform()  # Вставляем полученный код
-
-        self.switch_to_webview()  # Переключаемся с native на webview
-        self.element_is_enabled(locator=self.LOGIN_BY_PASSWORD)  # Ожидание элемента
-        logger.info(f"Вкладка '{self.get_text(locator=self.LOGIN_BY_PASSWORD)}' найдена.")
-        assert self.get_text(locator=self.LOGIN_BY_PASSWORD) == "По паролю"
-        self.click(locator=self.LOGIN_BY_PASSWORD)  # Переключаемся на вкладку "По паролю"
-        self.element_is_enabled(locator=self.FIELD_PASSWORD)  # Ожидание элемента
-        self.send_keys(locator=self.FIELD_PASSWORD, value=password)  # Ввод пароля
-        actions.send_keys(Keys.ENTER).perform()  # Имитация нажатия Enter
-
-        self.switch_to_native()  # Переключаемся с webview на native
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="otp") as executor:
+            otp_future = executor.submit(lambda: otp_helper.get_notifications().get_login_code())
+            self.warm_up_webview()
+            otp_code = otp_future.result()
+        self.actions().keys(otp_code).perform()  # Вставляем полученный код
+
+        with self.webview():  # Страница входа банка в WebView, по выходу из блока возвращаемся в native
+            self.element_is_enabled(locator=self.LOGIN_BY_PASSWORD)  # Ожидание элемента
+            logger.info(f"Вкладка '{self.get_text(locator=self.LOGIN_BY_PASSWORD)}' найдена.")
+            assert self.get_text(locator=self.LOGIN_BY_PASSWORD) == "По паролю"
+            self.click(locator=self.LOGIN_BY_PASSWORD)  # Переключаемся на вкладку "По паролю"
+            self.element_is_enabled(locator=self.FIELD_PASSWORD)  # Ожидание элемента
+            self.send_keys(locator=self.FIELD_PASSWORD, value=password)  # Ввод пароля
+            self.actions().keys(Keys.ENTER).perform()  # Имитация нажатия Enter
+
         self.element_is_enabled(locator=self.TEXT_ADD_CODE)  # Ожидание элемента
         logger.info(f"Открыт экран '{self.get_text(locator=self.TEXT_ADD_CODE)}'")
         assert "Установите" in self.get_text(locator=self.TEXT_ADD_CODE)
-        [self.click(locator=self.BUTTON_1) for _ in range(4)]  # Вводим код приложения: 1111
+        self.actions().tap(self.BUTTON_1, times=4).perform()  # Вводим код приложения: 1111 одним пакетом касаний
         self.element_is_enabled(locator=self.TEXT_ADD_CODE)  # Ожидание элемента
         logger.info(f"Открыт экран '{self.get_text(locator=self.TEXT_ADD_CODE)}'")
         assert self.get_text(locator=self.TEXT_ADD_CODE) == "Повторите код"
-        [self.click(locator=self.BUTTON_1) for _ in range(4)]  # Повторный ввод кода приложения: 1111
+        self.actions().tap(self.BUTTON_1, times=4).perform()  # Повторный ввод кода приложения: 1111
+
+    def _search_screen_opened(self, address: Optional[bool]) -> None:
+        """
+        Сообщает навигатору, какой вариант экрана поиска 'Выдача карты' открыт: ввод города и ввод адреса курьерской
+        доставки выглядят одинаково и различаются только действием, которое их открыло.
+        :param address: True — ввод адреса, False — ввод города, None — приложение перезапущено.
+        """
+        if self.on_search_screen is not None:
+            self.on_search_screen(address)
 
-    def check_and_close_pay_parking_popup(self):
-        """Метод проверки появления и закрытия popup 'Оплата парковок в Карте жителя'."""
+    def save_login_state(self, login_state: LoginStateCache, phone: str, wait_time=20):
+        """
+        Сохранение состояния авторизации после входа, когда открыт главный экран авторизованного пользователя.
+        Ошибка сохранения не прерывает тест.
+        :param login_state: Кеш состояния авторизации.
+        :param phone: Номер телефона пользователя.
+        :param wait_time: Время ожидания главного экрана.
+        """
         try:
-            logger.info("Ищем popup 'Оплата парковок в Карте жителя'.")
-            pay_parking_popup = self._find_element(locator=self.TEXT_PAY_PARKING)
-            if pay_parking_popup:
-                self.click(locator=self.BUTTON_CLOSE)
-                logger.info("Popup 'Оплата парковок в Карте жителя' закрыт.")
-        except (NoSuchElementException, TimeoutException):
+            self._wait_home_or([], wait_time)
+            login_state.save(self.driver, phone)
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить состояние авторизации: {e}")
+
+    def restore_login_state(self, login_state: LoginStateCache, phone: str, wait_time=20) -> bool:
+        """
+        Восстановление сохраненной авторизации пользователя вместо входа через банк.
+        После запуска приложения ожидается главный экран авторизованного пользователя (при запросе кода приложения
+        вводится 1111). Если открылся экран входа или восстановление не удалось, сохраненное состояние удаляется,
+        данные приложения очищаются, и тест выполняет обычную авторизацию.
+        :param login_state: Кеш состояния авторизации.
+        :param phone: Номер телефона пользователя.
+        :param wait_time: Время ожидания экранов после запуска приложения.
+        :return: True, если приложение открылось авторизованным.
+        """
+        try:
+            if not login_state.restore(self.driver, phone):
+                return False
+            self.invalidate_screen_state()
+            if self._wait_authorized_home(wait_time):
+                login_state.restored += 1
+                logger.info(f"Авторизация пользователя {phone} восстановлена из кеша.")
+                return True
+            logger.info("Сохраненная авторизация не принята приложением, выполняем вход через банк.")
+        except Exception as e:
+            logger.warning(f"Не удалось восстановить авторизацию: {e}")
+        login_state.failed += 1
+        login_state.discard(self.driver, phone)
+        self.reset_app_data()
+        return False
+
+    def _wait_authorized_home(self, wait_time=20) -> bool:
+        """
+        Ожидание главного экрана авторизованного пользователя после запуска приложения.
+        При запросе кода приложения вводится 1111.
+        :return: False, если открылся экран входа.
+        """
+        found = self._wait_home_or([self.BUTTON_1, self.BUTTON_LOGIN_VIA_AK_BARS], wait_time)
+        if found == self.BUTTON_1:
+            self.actions().tap(self.BUTTON_1, times=4).perform()  # Код приложения: 1111
+            found = self._wait_home_or([self.BUTTON_LOGIN_VIA_AK_BARS], wait_time)
+        return found == self.TEXT_ISSUE_CARD
+
+    def _wait_home_or(self, locators, wait_time=20):
+        """
+        Ожидание главного экрана авторизованного пользователя или одного из других элементов.
+        Локатор основной кнопки общий для нескольких экранов, поэтому главный экран определяется
+        по тексту кнопки 'Выпустить карту', а не по ее наличию.
+        :param locators: Другие ожидаемые элементы в порядке приоритета (проверяются раньше главного экрана).
+        :param wait_time: Время ожидания.
+        :return: TEXT_ISSUE_CARD для главного экрана или локатор найденного элемента.
+        """
+        return self.wait_for_any([*locators, self.TEXT_ISSUE_CARD], wait_time,
+                                 texts={self.TEXT_ISSUE_CARD: self.HOME_BUTTON_TEXT})
+
+    def restart_to_home(self, wait_time=20):
+        """Перезапуск приложения без очистки данных и возврат на главный экран авторизованного пользователя."""
+        package = app_id(self.driver)
+        self.driver.terminate_app(package)
+        self.driver.activate_app(package)
+        self.context.invalidate()
+        self.invalidate_screen_state()
+        self._search_screen_opened(None)
+        assert self._wait_authorized_home(wait_time), "После перезапуска приложения открылся экран входа"
+
+    def reset_app_data(self):
+        """Очистка данных приложения и повторный запуск (экран входа как после установки)."""
+        package = app_id(self.driver)
+        self.driver.terminate_app(package)
+        self.driver.execute_script("mobile: clearApp", {"appId": package})
+        self.driver.activate_app(package)
+        self.context.invalidate()
+        self.invalidate_screen_state()
+        self._search_screen_opened(None)
+
+    def check_and_close_pay_parking_popup(self, wait_time=20):
+        """
+        Метод проверки появления и закрытия popup 'Оплата парковок в Карте жителя'.
+        Ожидание завершается, как только появляется попап или главный экран авторизованного пользователя.
+        :param wait_time: Время ожидания.
+        """
+        logger.info("Ищем popup 'Оплата парковок в Карте жителя'.")
+        try:
+            found = self._wait_home_or([self.TEXT_PAY_PARKING], wait_time)
+        except TimeoutException:
+            found = None
+        if found == self.TEXT_PAY_PARKING:
+            self._close_popup()
+            logger.info("Popup 'Оплата парковок в Карте жителя' закрыт.")
+        else:
             logger.info("Popup 'Оплата парковок в Карте жителя' не найден. Продолжаем тест.")
 
     def issue_card(self):
@@ -210,8 +334,59 @@ class MainScreen(BaseScreen):
         logger.info(f"Кнопка '{self.get_text(locator=self.TEXT_APPLY_CARD)}' найдена.")
         assert self.get_text(locator=self.TEXT_APPLY_CARD) == "Оформить карту"
         self.click(locator=self.BUTTON_CONFIRM)  # Клик 'Оформить карту'
+        self._search_screen_opened(False)
         assert self.get_text(locator=self.TEXT_CARD_ISSUANCE) == "Выдача карты"
 
+    def open_card_issuance(self, use_shortcut: bool = True, wait_time=10):
+        """
+        Переход с главного экрана на экран 'Выдача карты'.
+        Если для экрана задан диплинк или активити (DeepLinks), экран открывается напрямую, иначе — кликами
+        'Выпустить карту' -> пластиковая карта -> 'Оформить карту'.
+        :param use_shortcut: Использовать быстрый переход, если он доступен.
+        :param wait_time: Время ожидания экрана после быстрого перехода.
+        """
+        if use_shortcut and self._open_by_shortcut(DeepLinks.CARD_ISSUANCE, DeepLinks.CARD_ISSUANCE_ACTIVITY,
+                                                   self.TEXT_CARD_ISSUANCE, Notice.TEXT_CARD_ISSUANCE, wait_time):
+            self._search_screen_opened(False)
+            return
+        self.issue_card()
+        self.issue_plastic_card()
+        self.apply_plastic_card()
+
+    def _open_by_shortcut(self, url: str, activity: str, landing, landing_text: str, wait_time=10) -> bool:
+        """
+        Быстрый переход на экран диплинком или запуском активити с проверкой, что открылся нужный экран.
+        Переход, который не сработал, больше не используется до конца прогона.
+        :param url: Диплинк экрана (пустая строка — нет диплинка).
+        :param activity: Активити экрана, например '.CardIssuanceActivity' (пустая строка — нет активити).
+        :param landing: Локатор элемента, по которому проверяется открытый экран.
+        :param landing_text: Ожидаемый текст элемента.
+        :param wait_time: Время ожидания экрана.
+        :return: True, если открыт нужный экран; False — нужно перейти кликами.
+        """
+        shortcut = url or activity
+        if not shortcut or shortcut in self._failed_shortcuts:
+            return False
+        package = app_id(self.driver)
+        try:
+            if url:
+                self.driver.execute_script("mobile: deepLink", {"url": url, "package": package})
+            else:
+                self.driver.execute_script("mobile: startActivity", {"intent": f"{package}/{activity}"})
+            self.invalidate_screen_state()
+            self.wait_for_any([landing], wait_time)
+            if self.snapshot().text(landing) == landing_text:
+                logger.info(f"Открыт экран '{landing_text}' быстрым переходом {shortcut}.")
+                return True
+        except Exception as e:
+            logger.warning(f"Быстрый переход {shortcut} не выполнен: {e}")
+        self._failed_shortcuts.add(shortcut)
+        logger.info(f"Быстрый переход на экран '{landing_text}' недоступен, переходим кликами.")
+        self.invalidate_screen_state()
+        if not self.snapshot().exists(self.TEXT_ISSUE_CARD):
+            self.press_back()  # Возвращаемся на главный экран, если переход открыл другой экран
+        return False
+
     def input_delivery_city(self, city: str = "Альметьевск"):
         """
         Ввод города доставки пластиковой карты.
@@ -256,8 +431,9 @@ class MainScreen(BaseScreen):
         self.element_is_enabled(locator=self.BUTTON_BY_COURIER)  # Ожидание элемента
         self.click(locator=self.BUTTON_BY_COURIER)  # Выбор варианта доставки "Курьером"
         self.element_is_enabled(locator=self.TEXT_ADDRESS_TO_RECEIVE_CARD)  # Ожидание элемента
-        logger.info(f"Появилось поле: {self.get_text(locator=self.TEXT_ADDRESS_TO_RECEIVE_CARD)}")
-        assert self.get_text(locator=self.TEXT_ADDRESS_TO_RECEIVE_CARD) == Notice.NOTICE_ADDRESS_TO_RECEIVE_CARD
+        address_field = self.get_text_from_snapshot(locator=self.TEXT_ADDRESS_TO_RECEIVE_CARD)
+        logger.info(f"Появилось поле: {address_field}")
+        assert address_field == Notice.NOTICE_ADDRESS_TO_RECEIVE_CARD
 
     def receive_card_from_bank(self, notice: str = "Получение"):
         """
@@ -271,8 +447,9 @@ class MainScreen(BaseScreen):
         self.element_is_enabled(locator=self.BUTTON_BY_BANK)  # Ожидание элемента
         self.click(locator=self.BUTTON_BY_BANK)  # Выбор варианта доставки "В отделении"
         self.element_is_enabled(locator=self.TEXT_ADDRESS_OF_BANK_BRANCH)  # Ожидание элемента
-        logger.info(f"Появилось поле: {self.get_text(locator=self.TEXT_ADDRESS_OF_BANK_BRANCH)}")
-        assert self.get_text(locator=self.TEXT_ADDRESS_OF_BANK_BRANCH) == Notice.NOTICE_ADDRESS_OF_BANK_BRANCH
+        address_field = self.get_text_from_snapshot(locator=self.TEXT_ADDRESS_OF_BANK_BRANCH)
+        logger.info(f"Появилось поле: {address_field}")
+        assert address_field == Notice.NOTICE_ADDRESS_OF_BANK_BRANCH
 
     def how_to_get_card(self, method: str):
         """
@@ -292,8 +469,9 @@ class MainScreen(BaseScreen):
         self.element_is_enabled(locator=self.BUTTON_SELECT_ADDRESS)  # Ожидание элемента
         self.click(locator=self.BUTTON_SELECT_ADDRESS)  # Открыть список адресов
         self.element_is_enabled(locator=self.TEXT_SELECT_BANK_BRANCH)  # Ожидание элемента
-        logger.info(f"Открылся экран: {self.get_text(locator=self.TEXT_SELECT_BANK_BRANCH)}")
-        assert self.get_text(locator=self.TEXT_SELECT_BANK_BRANCH) == Notice.TEXT_SELECT_BANK_BRANCH
+        screen_title = self.get_text_from_snapshot(locator=self.TEXT_SELECT_BANK_BRANCH)
+        logger.info(f"Открылся экран: {screen_title}")
+        assert screen_title == Notice.TEXT_SELECT_BANK_BRANCH
 
         # Выбираем в списке первое отделение банка
         self.click(locator=self.LINK_SELECT_FIRST_BANK_BRANCH)  # Выбрать первое отделение банка в списке
@@ -303,8 +481,9 @@ class MainScreen(BaseScreen):
 
         # Проверяем, что после выбора отделения банка мы вернулись на экран вариантов доставки карты
         self.element_is_enabled(locator=self.TEXT_ADDRESS_OF_BANK_BRANCH)  # Ожидание элемента
-        logger.info(f"Появилось поле: {self.get_text(locator=self.TEXT_ADDRESS_OF_BANK_BRANCH)}")
-        assert self.get_text(locator=self.TEXT_ADDRESS_OF_BANK_BRANCH) == Notice.NOTICE_ADDRESS_OF_BANK_BRANCH
+        address_field = self.get_text_from_snapshot(locator=self.TEXT_ADDRESS_OF_BANK_BRANCH)
+        logger.info(f"Появилось поле: {address_field}")
+        assert address_field == Notice.NOTICE_ADDRESS_OF_BANK_BRANCH
         self.element_is_enabled(locator=self.BUTTON_CONFIRM)  # Ожидание элемента
 
     def open_page_to_input_address(self):
@@ -312,6 +491,7 @@ class MainScreen(BaseScreen):
         # Открываем поле для ввода адреса доставки
         self.element_is_enabled(locator=self.BUTTON_SELECT_ADDRESS)  # Ожидание элемента
         self.click(locator=self.BUTTON_SELECT_ADDRESS)  # Открыть форму ввода адреса
+        self._search_screen_opened(True)
 
         # Проверяем, что открылась нужная страница и есть поле ввода адреса доставки
         self.element_is_enabled(locator=self.TEXT_CARD_ISSUANCE)  # Ожидание элемента
@@ -325,6 +505,7 @@ class MainScreen(BaseScreen):
         :param city: Новый город доставки карты
         """
         self.click(locator=self.FIELD_CITY_RECEIPT)  # Клик по полю "Город, где вы хотите получить карту"
+        self._search_screen_opened(False)
         # Возвращаемся на страницу ввода города доставки карты
         assert self.get_text(locator=self.TEXT_CARD_ISSUANCE) == "Выдача карты"
         logger.info(f"Открыт экран: {self.get_text(locator=self.TEXT_CARD_ISSUANCE)}")
@@ -334,9 +515,11 @@ class MainScreen(BaseScreen):
         self.click(locator=self.LINK_CITY_IN_LIST)  # Выбираем город из списка
         assert self.get_text(locator=self.TEXT_NEXT_BUTTON) == Notice.TEXT_NEXT
         self.click(locator=self.BUTTON_CONFIRM)
-        logger.info(f"Город доставки: {self.get_text(locator=self.FIELD_CITY_RECEIPT)}")
-        assert city in self.get_text(locator=self.FIELD_CITY_RECEIPT)  # Проверяем, что отображается новый город
-        assert self.get_text(locator=self.TEXT_RECEIPT) == Notice.TEXT_RECEIPT  # Проверяем варианты доставки
+        self._find_element(locator=self.FIELD_CITY_RECEIPT)  # Ожидание экрана вариантов получения
+        city_receipt, receipt = self.get_texts_from_snapshot(self.FIELD_CITY_RECEIPT, self.TEXT_RECEIPT)
+        logger.info(f"Город доставки: {city_receipt}")
+        assert city in city_receipt  # Проверяем, что отображается новый город
+        assert receipt == Notice.TEXT_RECEIPT  # Проверяем варианты доставки
         self.element_is_enabled(locator=self.BUTTON_CONFIRM)  # Проверяем, что кнопка "Заказать" отображается
 
     def validate_input_delivery_valid_address(self, street: str = "Чистопольская, д 1"):
@@ -396,5 +579,6 @@ class MainScreen(BaseScreen):
         self.click(locator=self.BUTTON_CONFIRM)  # Возвращаемся на главный экран
         self.swipe_to_refresh()
         self.element_is_enabled(locator=self.TEXT_REQUEST_IS_PROCESSED)  # Ожидание элемента
-        logger.info(f"На главном экране отображается: {self.get_text(locator=self.TEXT_CARD_RESIDENT_TATARSTAN)}")
-        assert self.get_text(locator=self.TEXT_CARD_RESIDENT_TATARSTAN) == Notice.TEXT_CARD_RESIDENT_TATARSTAN
+        card_name = self.get_text_from_snapshot(locator=self.TEXT_CARD_RESIDENT_TATARSTAN)
+        logger.info(f"На главном экране отображается: {card_name}")
+        assert card_name == Notice.TEXT_CARD_RESIDENT_TATARSTAN
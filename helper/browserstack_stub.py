@@ -0,0 +1,173 @@
+"""
+Локальные заглушки сервисов BrowserStack для проверки инфраструктуры запуска без реальных устройств.
+
+Пример запуска хаба с лимитом в 2 параллельные сессии:
+    python -m helper.browserstack_stub --port 4723 --limit 2 --session-delay 3
+после чего тесты запускаются с BS_SERVER_URL=http://127.0.0.1:4723/wd/hub.
+
+Для проверки кеша загрузок APK используется StubAppUpload, его адрес передается через BS_API_URL.
+"""
+import argparse
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Set
+
+logger = logging.getLogger("BrowserStack stub")
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    server: "StubServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(format, *args)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, status: int, payload: Any) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        self._send_json(*self.server.handle("GET", self.path, b""))
+
+    def do_POST(self) -> None:
+        self._send_json(*self.server.handle("POST", self.path, self._read_body()))
+
+    def do_DELETE(self) -> None:
+        self._send_json(*self.server.handle("DELETE", self.path, b""))
+
+
+class StubServer(ThreadingHTTPServer):
+    """Базовый HTTP-сервер заглушки, запускаемый в фоновом потоке."""
+    daemon_threads = True
+
+    def __init__(self, port: int = 0):
+        super().__init__(("127.0.0.1", port), _StubHandler)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def handle(self, method: str, path: str, body: bytes):
+        return 404, {"value": {"error": "unknown command", "message": f"{method} {path}"}}
+
+
+class StubHub(StubServer):
+    """
+    Заглушка WebDriver-хаба с лимитом параллельных сессий, как у тарифа BrowserStack.
+    При превышении лимита создание сессии завершается ошибкой. Хаб запоминает максимальное количество
+    одновременно открытых сессий и число отказов — по ним проверяется работа контроля допуска.
+    """
+
+    def __init__(self, port: int = 0, limit: int = 1, session_delay: float = 0.0):
+        """
+        :param port: Порт сервера (0 — любой свободный).
+        :param limit: Лимит одновременных сессий.
+        :param session_delay: Искусственная задержка создания сессии, сек.
+        """
+        super().__init__(port)
+        self.limit = limit
+        self.session_delay = session_delay
+        self.sessions: Set[str] = set()
+        self.max_concurrent = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"{super().url}/wd/hub"
+
+    def handle(self, method: str, path: str, body: bytes):
+        parts = [part for part in path.split("/") if part]
+        if parts[:2] == ["wd", "hub"]:
+            parts = parts[2:]
+        if method == "POST" and parts == ["session"]:
+            return self._create_session(json.loads(body) if body else {})
+        if method == "DELETE" and len(parts) == 2 and parts[0] == "session":
+            with self._lock:
+                self.sessions.discard(parts[1])
+            return 200, {"value": None}
+        if len(parts) >= 2 and parts[0] == "session" and parts[1] not in self.sessions:
+            return 404, {"value": {"error": "invalid session id", "message": "Session not found"}}
+        return 200, {"value": None}
+
+    def _create_session(self, payload: Dict[str, Any]):
+        with self._lock:
+            if len(self.sessions) >= self.limit:
+                self.rejected += 1
+                return 500, {"value": {"error": "session not created",
+                                       "message": "All parallel tests are currently in use"}}
+            session_id = uuid.uuid4().hex
+            self.sessions.add(session_id)
+            self.max_concurrent = max(self.max_concurrent, len(self.sessions))
+        time.sleep(self.session_delay)
+        capabilities = payload.get("capabilities", {}).get("alwaysMatch", {})
+        return 200, {"value": {"sessionId": session_id, "capabilities": capabilities}}
+
+
+class StubAppUpload(StubServer):
+    """
+    Заглушка REST API загрузки приложений BrowserStack App Automate:
+    POST /app-automate/upload и GET /app-automate/recent_apps/<custom_id>.
+    Метод expire() имитирует удаление приложения на стороне BrowserStack (истечение срока хранения).
+    """
+
+    def __init__(self, port: int = 0):
+        super().__init__(port)
+        self.apps: Dict[str, str] = {}
+        self.uploads = 0
+        self._lock = threading.Lock()
+
+    def expire(self, custom_id: str) -> None:
+        with self._lock:
+            self.apps.pop(custom_id, None)
+
+    def handle(self, method: str, path: str, body: bytes):
+        parts = [part for part in path.split("/") if part]
+        if method == "POST" and parts == ["app-automate", "upload"]:
+            match = re.search(rb'name="custom_id"\r\n\r\n([^\r]+)', body)
+            custom_id = match.group(1).decode() if match else uuid.uuid4().hex
+            with self._lock:
+                self.uploads += 1
+                self.apps[custom_id] = f"bs://{uuid.uuid4().hex}"
+                return 200, {"app_url": self.apps[custom_id], "custom_id": custom_id}
+        if method == "GET" and parts[:2] == ["app-automate", "recent_apps"] and len(parts) == 3:
+            with self._lock:
+                app_url = self.apps.get(parts[2])
+            if app_url is None:
+                return 200, {"message": "No results found"}
+            return 200, [{"app_url": app_url, "custom_id": parts[2]}]
+        return super().handle(method, path, body)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Локальная заглушка WebDriver-хаба BrowserStack")
+    parser.add_argument("--port", type=int, default=4723)
+    parser.add_argument("--limit", type=int, default=1)
+    parser.add_argument("--session-delay", type=float, default=0.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    hub = StubHub(port=args.port, limit=args.limit, session_delay=args.session_delay)
+    logger.info(f"Заглушка хаба запущена: {hub.url}, лимит сессий {hub.limit}")
+    hub.serve_forever()
@@ -0,0 +1,97 @@
+import argparse
+import time
+from typing import Dict, List, Tuple
+
+from appium import webdriver
+from appium.options.android import UiAutomator2Options
+
+from fixtures.screens.main_screen import MainScreen
+from utils.locator_compiler import compile_locator
+from utils.page_snapshot import PageSnapshot
+
+
+def _measure(action, rounds: int) -> float:
+    """Среднее время выполнения действия в миллисекундах."""
+    started = time.perf_counter()
+    for _ in range(rounds):
+        action()
+    return (time.perf_counter() - started) / rounds * 1000
+
+
+def benchmark_locators(driver, locators: Dict[str, Tuple[str, str]], rounds: int = 5) -> List[Dict[str, object]]:
+    """
+    Сравнивает время поиска элементов текущего экрана разными стратегиями:
+    исходный XPath, скомпилированный локатор (ID/UiAutomator) и локальное вычисление по снимку page_source.
+    Вызывается на открытом экране, например из отладочного теста:
+        benchmark_locators(app.driver, {"TEXT_CARD_ISSUANCE": MainScreen.TEXT_CARD_ISSUANCE})
+    :param driver: Драйвер с открытым нужным экраном (нативный контекст).
+    :param locators: Локаторы по именам.
+    :param rounds: Количество повторов для усреднения.
+    :return: Строки результата: имя, стратегия, найдено элементов и время в мс для каждой стратегии.
+    """
+    snapshot_ms = _measure(lambda: driver.page_source, rounds)
+    snapshot = PageSnapshot(driver.page_source)
+    rows = []
+    for name, locator in locators.items():
+        compiled = compile_locator(locator)
+        row = {
+            "name": name,
+            "strategy": compiled.primary[0],
+            "found": len(driver.find_elements(*locator)),
+            "xpath_ms": round(_measure(lambda: driver.find_elements(*locator), rounds), 1),
+            "compiled_ms": None,
+            "snapshot_local_ms": round(_measure(lambda: snapshot.find_all(locator), rounds), 3),
+        }
+        if compiled.fallback is not None:
+            row["compiled_ms"] = round(_measure(lambda: driver.find_elements(*compiled.primary), rounds), 1)
+        rows.append(row)
+    rows.append({"name": "page_source", "strategy": "snapshot", "found": None, "xpath_ms": None,
+                 "compiled_ms": None, "snapshot_local_ms": round(snapshot_ms, 1)})
+    return rows
+
+
+def screen_locators(screen: type, names: List[str]) -> Dict[str, Tuple[str, str]]:
+    """
+    Локаторы класса экрана по именам: все атрибуты вида (стратегия, значение) или только перечисленные.
+    :param screen: Класс экрана (например, MainScreen).
+    :param names: Имена локаторов; пустой список — все локаторы экрана.
+    """
+    locators = {name: getattr(screen, name) for name in dir(screen)
+                if name.isupper() and isinstance(getattr(screen, name), tuple) and len(getattr(screen, name)) == 2}
+    unknown = [name for name in names if name not in locators]
+    if unknown:
+        raise ValueError(f"Нет локаторов {', '.join(unknown)} в {screen.__name__}")
+    return {name: locators[name] for name in names} if names else locators
+
+
+def _cell(value) -> str:
+    return "-" if value is None else str(value)
+
+
+def format_benchmark(rows: List[Dict[str, object]]) -> str:
+    """Таблица результатов benchmark_locators для лога."""
+    lines = [f"{'локатор':<32}{'стратегия':<22}{'найдено':>8}{'xpath, мс':>11}{'быстрый, мс':>13}{'снимок, мс':>12}"]
+    for row in rows:
+        lines.append(f"{row['name']:<32}{row['strategy']:<22}{_cell(row['found']):>8}"
+                     f"{_cell(row['xpath_ms']):>11}{_cell(row['compiled_ms']):>13}{_cell(row['snapshot_local_ms']):>12}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сравнение времени поиска локаторов MainScreen на открытом экране")
+    parser.add_argument("names", nargs="*", help="Имена локаторов MainScreen (по умолчанию — все)")
+    parser.add_argument("--server", default="http://localhost:4723", help="URL сервера Appium")
+    parser.add_argument("--device_name", default="emulator-5554", help="Имя устройства")
+    parser.add_argument("--rounds", type=int, default=5, help="Количество повторов для усреднения")
+    args = parser.parse_args()
+    locators = screen_locators(MainScreen, args.names)
+    # Сессия без приложения и без сброса: замеры выполняются на экране, открытом на устройстве вручную
+    options = UiAutomator2Options()
+    options.platform_name = "Android"
+    options.device_name = args.device_name
+    options.no_reset = True
+    driver = webdriver.Remote(command_executor=args.server, options=options)
+    try:
+        print(format_benchmark(benchmark_locators(driver, locators, args.rounds)))
+    finally:
+        driver.quit()
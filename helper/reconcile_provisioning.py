@@ -0,0 +1,99 @@
+import argparse
+import logging
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from api.provisioning_journal import DEFAULT_JOURNAL_DIR, ProvisioningJournal
+from api.user_api import UserAPI
+from utils.user_warehouse import UserWarehouse
+
+logger = logging.getLogger("API")
+
+
+def created_ids(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Идентификаторы данных, уже созданных на бэкендах по записи журнала."""
+    steps = record["steps"]
+    ids = {}
+    if "user_crm" in steps:
+        ids["crm_id"] = steps["user_crm"].get("crm_id")
+    if "user_way4" in steps:
+        ids["way4_id"] = steps["user_way4"]["result"]["client"]["way4Id"]
+    if "biztalk_id" in steps:
+        ids["biztalk_id"] = steps["biztalk_id"].get("result")
+    if "digital_card" in steps:
+        ids["card_id"] = steps["digital_card"]["result"]["contract"]["card"]["id"]
+    return ids
+
+
+def select(journal: ProvisioningJournal, ids: List[str], older_than: float,
+           include_abandoned: bool = False) -> List[Dict[str, Any]]:
+    """Незавершенные записи: указанные или все, созданные раньше older_than часов назад."""
+    records = journal.unfinished(include_abandoned)
+    if ids:
+        return [record for record in records if record["id"] in ids]
+    return [record for record in records if time.time() - record["created"] >= older_than * 3600]
+
+
+def list_records(records: List[Dict[str, Any]]) -> None:
+    if not records:
+        print("Незавершенных записей нет.")
+    for record in records:
+        age = (time.time() - record["created"]) / 3600
+        print(f"{record['id']}  {record['status']:<12} {age:>6.1f} ч  попыток: {record.get('attempts', 1)}  "
+              f"шаги: {', '.join(record['steps']) or 'нет'}")
+        print(f"    создано: {created_ids(record) or 'ничего'}; ошибка: {record['error']}")
+
+
+def finish_records(journal: ProvisioningJournal, records: List[Dict[str, Any]],
+                   warehouse_path: Optional[Path] = None) -> None:
+    warehouse = UserWarehouse(warehouse_path) if warehouse_path else None
+    finished = 0
+    for record in records:
+        try:
+            user = UserAPI.resume_provisioning(journal, record["id"])
+        except Exception as e:
+            print(f"{record['id']}: не удалось завершить: {e}")
+            continue
+        finished += 1
+        print(f"{record['id']}: пользователь {user.get('phone')} создан.")
+        if warehouse is not None:
+            warehouse.add(re.sub(r"\D", "", str(user["phone"])), UserAPI.TEST_USER_PASSWORD, user)
+    print(f"Завершено {finished} из {len(records)}.")
+
+
+def cleanup_records(journal: ProvisioningJournal, records: List[Dict[str, Any]]) -> None:
+    """
+    Помечает записи брошенными. API удаления клиентов нет, поэтому созданные данные выводятся для ручной очистки
+    и остаются в файлах записей.
+    """
+    for record in records:
+        try:
+            with journal.locked(record["id"]):
+                journal.abandon(record["id"])
+        except RuntimeError as e:
+            print(f"{record['id']}: пропущена: {e}")
+            continue
+        print(f"{record['id']}: помечена брошенной, созданные данные: {created_ids(record) or 'нет'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сверка журнала создания тестовых пользователей")
+    parser.add_argument("command", choices=("list", "finish", "cleanup"),
+                        help="list — показать незавершенные и брошенные записи, finish — завершить создание пользователей, "
+                             "cleanup — пометить записи брошенными")
+    parser.add_argument("ids", nargs="*", help="Идентификаторы записей (по умолчанию — все незавершенные)")
+    parser.add_argument("--journal-dir", type=Path, default=DEFAULT_JOURNAL_DIR)
+    parser.add_argument("--older-than", type=float, default=0.0, help="Только записи старше N часов")
+    parser.add_argument("--warehouse", type=Path, help="Добавить завершенных пользователей на склад (файл SQLite)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    journal = ProvisioningJournal(args.journal_dir)
+    records = select(journal, args.ids, args.older_than, include_abandoned=args.command == "list")
+    if args.command == "list":
+        list_records(records)
+    elif args.command == "finish":
+        finish_records(journal, records, args.warehouse)
+    else:
+        cleanup_records(journal, records)
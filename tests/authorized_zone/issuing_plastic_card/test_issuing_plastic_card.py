@@ -7,6 +7,7 @@ class TestIssuingPlasticCard:
 
     @pytest.mark.core
     @pytest.mark.limited
+    @pytest.mark.click_navigation
     @pytestrail.case("C15798752")
     def test_issuing_resident_plastic_card_from_main_screen(self, app, issue_plastic_card):
         """Тест выпуска пластиковой карты жителя с главного экрана приложения."""
@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def setup() -> None:
+    """Юнит-тесты не запускают приложение: autouse-фикстура setup корневого conftest.py (сессия Appium) заменена."""
+    return None
@@ -0,0 +1,53 @@
+import pytest
+from appium.webdriver.common.appiumby import AppiumBy
+
+from utils.locator_compiler import CompiledLocator, compile_locator
+
+
+class TestLocatorCompiler:
+    """Тесты перевода XPath-локаторов в UiSelector."""
+
+    @pytest.mark.parametrize("xpath, selector", [
+        ('//android.widget.TextView[@text="Выдача карты"]',
+         'new UiSelector().className("android.widget.TextView").text("Выдача карты")'),
+        ('//*[@resource-id="*****:id/kit_label_large_button"]',
+         'new UiSelector().resourceId("*****:id/kit_label_large_button")'),
+        ("//android.widget.Button[@content-desc='Назад']",
+         'new UiSelector().className("android.widget.Button").description("Назад")'),
+        ('//android.widget.TextView[contains(@text, "Курьер") and @resource-id="android:id/title"]',
+         'new UiSelector().className("android.widget.TextView").textContains("Курьер").resourceId("android:id/title")'),
+        ('(//android.widget.EditText[@text="Город"])[2]',
+         'new UiSelector().className("android.widget.EditText").text("Город").instance(1)'),
+        ('//*[@text=\'Текст с "кавычками" and or\']',
+         'new UiSelector().text("Текст с \\"кавычками\\" and or")'),
+    ])
+    def test_compiles_to_ui_selector(self, xpath, selector):
+        """Поддерживаемые выражения компилируются в UiSelector, исходный XPath остается запасным локатором."""
+        compiled = compile_locator((AppiumBy.XPATH, xpath))
+        assert compiled == CompiledLocator((AppiumBy.ANDROID_UIAUTOMATOR, selector), (AppiumBy.XPATH, xpath))
+
+    @pytest.mark.parametrize("xpath", [
+        '//android.widget.LinearLayout[.//android.widget.TextView[@text="Адрес"]]',
+        '//android.widget.TextView[@text="Да" or @text="Нет"]',
+        '//android.widget.TextView[@text="Адрес"]/following-sibling::android.widget.EditText',
+        '//input[@name="phone"]',
+        '//android.widget.TextView[starts-with(@text, "Карта")]',
+        '//android.widget.TextView[@index="0"]',
+    ])
+    def test_keeps_unsupported_xpath(self, xpath):
+        """Вложенные пути, or, оси, HTML-теги и неизвестные условия остаются XPath без запасного локатора."""
+        assert compile_locator((AppiumBy.XPATH, xpath)) == CompiledLocator((AppiumBy.XPATH, xpath), None)
+
+    def test_keeps_other_strategies(self):
+        locator = (AppiumBy.ID, "android:id/button1")
+        assert compile_locator(locator) == CompiledLocator(locator, None)
+
+    def test_disabled_by_env(self, monkeypatch):
+        """LOCATOR_COMPILER=false выключает компиляцию (кеш сбрасывается, чтобы не вернуть прошлый результат)."""
+        monkeypatch.setenv("LOCATOR_COMPILER", "false")
+        compile_locator.cache_clear()
+        locator = (AppiumBy.XPATH, '//android.widget.TextView[@text="Выдача карты"]')
+        try:
+            assert compile_locator(locator) == CompiledLocator(locator, None)
+        finally:
+            compile_locator.cache_clear()
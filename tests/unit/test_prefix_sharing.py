@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+
+from utils.prefix_sharing import CheckpointRegistry, group_by_prefix, prefix_key
+
+
+class FakeItem:
+    """Тест pytest с фикстурами, маркерами и параметрами."""
+
+    def __init__(self, name, fixtures=("issue_plastic_card",), markers=(), params=None):
+        self.name = name
+        self.fixturenames = fixtures
+        self.markers = {marker: SimpleNamespace(name=marker) for marker in markers}
+        self.callspec = SimpleNamespace(params=params) if params is not None else None
+        self.added = []
+
+    def get_closest_marker(self, name):
+        return self.markers.get(name)
+
+    def add_marker(self, marker):
+        self.added.append(marker)
+
+
+class TestPrefixGrouping:
+    """Тесты группировки тестов по общему префиксу."""
+
+    def test_prefix_key(self):
+        assert prefix_key(FakeItem("shared")) == ("issue_plastic_card",)
+        assert prefix_key(FakeItem("no_prefix", fixtures=("app",))) is None
+        assert prefix_key(FakeItem("clicks", markers=("click_navigation",))) is None
+        assert prefix_key(FakeItem("new_user", params={"issue_plastic_card": True})) is None
+        assert prefix_key(FakeItem("city", params={"city": "Нальчик"})) == ("issue_plastic_card",)
+
+    def test_group_by_prefix(self):
+        items = [FakeItem("a"), FakeItem("isolated", fixtures=("app",)), FakeItem("b"),
+                 FakeItem("clicks", markers=("click_navigation",)), FakeItem("c")]
+        assert [item.name for item in group_by_prefix(items)] == ["a", "b", "c", "isolated", "clicks"]
+        groups = {item.name: [marker.kwargs["name"] for marker in item.added] for item in items}
+        assert groups == {"a": ["prefix-issue_plastic_card"], "b": ["prefix-issue_plastic_card"],
+                          "c": ["prefix-issue_plastic_card"], "isolated": [], "clicks": []}
+
+
+class TestCheckpointRegistry:
+    """Тесты контрольной точки общего префикса."""
+
+    def test_resume_after_save(self):
+        registry = CheckpointRegistry()
+        first, second = FakeItem("a"), FakeItem("b")
+        assert not registry.can_resume(first)
+        registry.save(first)
+        assert registry.finish(first, failed=False, recover=lambda: True)
+        assert registry.resume(second, lambda: None)
+        assert (registry.built, registry.resumed, registry.recovered) == (1, 1, 0)
+
+    def test_failed_recovery_invalidates(self):
+        registry = CheckpointRegistry()
+        item = FakeItem("a")
+        registry.save(item)
+        assert not registry.finish(item, failed=True, recover=lambda: False)
+        assert not registry.can_resume(FakeItem("b"))
+
+    def test_recovered_failure_keeps_checkpoint(self):
+        registry = CheckpointRegistry()
+        item = FakeItem("a")
+        registry.save(item)
+        assert registry.finish(item, failed=True, recover=lambda: True)
+        assert registry.recovered == 1
+
+    def test_other_prefix_invalidates(self):
+        registry = CheckpointRegistry()
+        registry.save(FakeItem("a"))
+        assert not registry.finish(FakeItem("isolated", fixtures=("app",)), failed=False)
+        assert not registry.can_resume(FakeItem("b"))
+
+    def test_failed_restore_falls_back(self):
+        registry = CheckpointRegistry()
+        registry.save(FakeItem("a"))
+
+        def restore():
+            raise RuntimeError("экран не найден")
+
+        assert not registry.resume(FakeItem("b"), restore)
+        assert registry.fallbacks == 1
+        assert not registry.can_resume(FakeItem("c"))
@@ -0,0 +1,114 @@
+import json
+import os
+import time
+
+import pytest
+
+from api.provisioning_journal import ABANDONED, DONE, FAILED, IN_PROGRESS, ProvisioningJournal
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return ProvisioningJournal(tmp_path, stale_after=60, max_attempts=3)
+
+
+def age(journal: ProvisioningJournal, provisioning_id: str, seconds: float) -> None:
+    """Сдвигает время последнего обновления записи в прошлое."""
+    record = journal.load(provisioning_id)
+    record["updated"] -= seconds
+    journal._path(provisioning_id).write_text(json.dumps(record), encoding="utf-8")
+
+
+class TestUnfinished:
+    """Тесты выбора незавершенных записей."""
+
+    def test_failed_and_stale_records(self, journal):
+        failed = journal.begin()
+        journal.fail(failed, RuntimeError("CRM недоступна"))
+        stale = journal.begin()
+        age(journal, stale, 120)
+        journal.begin()  # Свежая запись in_progress: ее еще продолжает процесс
+        done = journal.begin()
+        journal.finish(done)
+        assert [record["id"] for record in journal.unfinished()] == sorted([failed, stale])
+
+    def test_abandoned_only_on_request(self, journal):
+        provisioning_id = journal.begin()
+        journal.abandon(provisioning_id)
+        assert journal.unfinished() == []
+        assert [record["status"] for record in journal.unfinished(include_abandoned=True)] == [ABANDONED]
+
+    def test_skips_broken_files(self, journal, tmp_path):
+        journal.fail(journal.begin(), RuntimeError("ошибка"))
+        (tmp_path / "broken.json").write_text("{", encoding="utf-8")
+        assert len(journal.unfinished()) == 1
+
+    def test_missing_dir(self, tmp_path):
+        assert ProvisioningJournal(tmp_path / "missing").unfinished() == []
+
+
+class TestClaim:
+    """Тесты захвата записей и счетчика попыток."""
+
+    def test_claim_counts_attempt(self, journal):
+        provisioning_id = journal.begin()
+        journal.record(provisioning_id, "user_crm", {"crm_id": 1})
+        journal.fail(provisioning_id, RuntimeError("ошибка"))
+        assert journal.claim(provisioning_id) == {"user_crm": {"crm_id": 1}}
+        record = journal.load(provisioning_id)
+        assert (record["status"], record["attempts"]) == (IN_PROGRESS, 2)
+
+    def test_claim_held_record(self, journal):
+        provisioning_id = journal.begin()
+        with pytest.raises(RuntimeError, match="другой процесс"):
+            journal.claim(provisioning_id)
+
+    def test_claim_done_record(self, journal):
+        provisioning_id = journal.begin()
+        journal.finish(provisioning_id)
+        with pytest.raises(RuntimeError, match="уже завершена"):
+            journal.claim(provisioning_id)
+        assert not journal._lock_path(provisioning_id).exists()
+
+    def test_stale_lock_is_taken_over(self, journal):
+        provisioning_id = journal.begin()
+        lock_path = journal._lock_path(provisioning_id)
+        os.utime(lock_path, (time.time() - 120, time.time() - 120))
+        assert journal._claim(provisioning_id)
+
+    def test_locked_keeps_attempts(self, journal):
+        """Захват без попытки (пометка брошенной) не меняет счетчик и снимается после блока."""
+        provisioning_id = journal.begin()
+        journal.fail(provisioning_id, RuntimeError("ошибка"))
+        with journal.locked(provisioning_id):
+            journal.abandon(provisioning_id)
+        record = journal.load(provisioning_id)
+        assert (record["status"], record["attempts"]) == (ABANDONED, 1)
+        assert not journal._lock_path(provisioning_id).exists()
+
+    def test_resume_or_begin_continues_oldest(self, journal):
+        provisioning_id = journal.begin()
+        journal.record(provisioning_id, "user_crm", {"crm_id": 1})
+        journal.fail(provisioning_id, RuntimeError("ошибка"))
+        assert journal.resume_or_begin() == (provisioning_id, {"user_crm": {"crm_id": 1}})
+        new_id, steps = journal.resume_or_begin()  # Запись захвачена: создается новая
+        assert new_id != provisioning_id and steps == {}
+
+    def test_exhausted_record_is_abandoned(self, journal):
+        provisioning_id = journal.begin()
+        for _ in range(journal.max_attempts - 1):
+            journal.fail(provisioning_id, RuntimeError("ошибка"))
+            journal.claim(provisioning_id)
+        journal.fail(provisioning_id, RuntimeError("ошибка"))
+        record = journal.load(provisioning_id)
+        assert (record["status"], record["attempts"]) == (ABANDONED, journal.max_attempts)
+        assert journal.resume_or_begin()[0] != provisioning_id
+
+    def test_failed_status(self, journal):
+        provisioning_id = journal.begin()
+        journal.fail(provisioning_id, ValueError("нет ответа"))
+        record = journal.load(provisioning_id)
+        assert (record["status"], record["error"]) == (FAILED, "ValueError: нет ответа")
+        journal.claim(provisioning_id)
+        journal.finish(provisioning_id)
+        assert journal.load(provisioning_id)["status"] == DONE
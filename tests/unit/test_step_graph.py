@@ -0,0 +1,66 @@
+import threading
+import time
+
+import pytest
+
+from api.step_graph import StepGraph
+
+
+class TestStepGraph:
+    """Тесты графа шагов создания пользователя."""
+
+    def test_inputs_passed_by_name(self):
+        graph = StepGraph()
+        graph.add("crm", lambda: 1)
+        graph.add("way4", lambda crm: crm + 1, inputs=("crm",))
+        graph.add("card", lambda crm, way4: crm + way4, inputs=("crm", "way4"))
+        assert graph.run() == {"crm": 1, "way4": 2, "card": 3}
+        assert graph.critical_path() == ["crm", "way4", "card"]
+
+    def test_independent_steps_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+        graph = StepGraph()
+        graph.add("crm", barrier.wait)
+        graph.add("biztalk_id", barrier.wait)
+        graph.run(max_workers=2)
+        assert set(graph.timings) == {"crm", "biztalk_id"}
+
+    def test_after_orders_without_input(self):
+        order = []
+        graph = StepGraph()
+        graph.add("second", lambda: order.append("second"), after=("first",))
+        graph.add("first", lambda: time.sleep(0.01) or order.append("first"))
+        graph.run()
+        assert order == ["first", "second"]
+
+    def test_completed_steps_skipped(self):
+        graph = StepGraph()
+        graph.add("crm", lambda: pytest.fail("шаг уже выполнен"))
+        graph.add("way4", lambda crm: crm["id"], inputs=("crm",))
+        recorded = {}
+        assert graph.run(completed={"crm": {"id": 7}}, on_step=recorded.__setitem__) == {"crm": {"id": 7}, "way4": 7}
+        assert graph.skipped == ["crm"] and recorded == {"way4": 7}
+
+    def test_error_stops_new_steps(self):
+        graph = StepGraph()
+        graph.add("crm", lambda: 1 / 0)
+        graph.add("way4", lambda crm: pytest.fail("шаг после ошибки"), inputs=("crm",))
+        with pytest.raises(ZeroDivisionError):
+            graph.run()
+        assert "way4" not in graph.timings
+
+    @pytest.mark.parametrize("steps, message", [
+        ({"a": ("b",), "b": ("a",)}, "Цикл"),
+        ({"a": ("missing",)}, "неизвестных"),
+    ])
+    def test_invalid_graph(self, steps, message):
+        graph = StepGraph()
+        for name, inputs in steps.items():
+            graph.add(name, lambda **kwargs: None, inputs=inputs)
+        with pytest.raises(ValueError, match=message):
+            graph.run()
+
+    def test_duplicate_step(self):
+        graph = StepGraph().add("crm", lambda: 1)
+        with pytest.raises(ValueError, match="уже добавлен"):
+            graph.add("crm", lambda: 2)
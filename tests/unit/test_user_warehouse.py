@@ -0,0 +1,121 @@
+import time
+
+import pytest
+
+from utils.user_warehouse import (AVAILABLE, LEASED, PROVISIONING, RETIRED, LeaseHeartbeat, UserWarehouse,
+                                  WarehouseProvisioner)
+
+
+@pytest.fixture
+def warehouse(tmp_path):
+    return UserWarehouse(tmp_path / "users.sqlite3", lease_ttl=60, provisioning_ttl=60)
+
+
+def expire(warehouse: UserWarehouse, user_id: int) -> None:
+    """Переводит срок аренды или резерва в прошлое."""
+    with warehouse._transaction() as connection:
+        connection.execute("UPDATE users SET expires = ? WHERE id = ?", (time.time() - 1, user_id))
+
+
+class TestLease:
+    """Тесты аренды пользователей."""
+
+    def test_lease_oldest_available(self, warehouse):
+        warehouse.add("79000000001", "1111", {"name": "первый"})
+        warehouse.add("79000000002", "2222")
+        lease = warehouse.lease(owner="gw0")
+        assert (lease.phone, lease.password, lease.data, lease.owner) == ("79000000001", "1111", {"name": "первый"}, "gw0")
+        assert warehouse.lease(owner="gw1").phone == "79000000002"
+        assert warehouse.lease() is None
+
+    def test_release_and_retire(self, warehouse):
+        warehouse.add("79000000001", "1111")
+        warehouse.add("79000000002", "2222")
+        first, second = warehouse.lease(), warehouse.lease()
+        warehouse.release(first)
+        warehouse.retire(second)
+        assert warehouse.counts() == {AVAILABLE: 1, RETIRED: 1}
+        assert warehouse.lease().phone == first.phone
+
+    def test_expired_lease_is_reissued(self, warehouse):
+        warehouse.add("79000000001", "1111")
+        lost = warehouse.lease(owner="gw0")
+        assert warehouse.lease(owner="gw1") is None
+        expire(warehouse, lost.id)
+        taken = warehouse.lease(owner="gw1")
+        assert taken.id == lost.id
+        assert not warehouse.renew(lost)  # Аренда выдана другому владельцу
+        assert warehouse.renew(taken)
+
+    def test_renew_extends_lease(self, warehouse):
+        warehouse.add("79000000001", "1111")
+        lease = warehouse.lease()
+        expire(warehouse, lease.id)
+        assert warehouse.renew(lease)
+        assert warehouse.lease() is None
+
+    def test_duplicate_phone_ignored(self, warehouse):
+        warehouse.add("79000000001", "1111")
+        warehouse.add("79000000001", "2222")
+        assert warehouse.counts() == {AVAILABLE: 1}
+
+    def test_heartbeat_renews_lease(self, warehouse):
+        warehouse.add("79000000001", "1111")
+        lease = warehouse.lease()
+        expire(warehouse, lease.id)
+        heartbeat = LeaseHeartbeat(warehouse, lease, interval=0.01)
+        heartbeat.start()
+        time.sleep(0.1)
+        heartbeat.stop()
+        assert warehouse.lease() is None
+
+
+class TestSlots:
+    """Тесты резерва мест под создаваемых пользователей."""
+
+    def test_reserve_up_to_target(self, warehouse):
+        warehouse.add("79000000001", "1111")
+        first = warehouse.reserve_slot(3)
+        second = warehouse.reserve_slot(3)
+        assert first is not None and second is not None
+        assert warehouse.reserve_slot(3) is None
+        assert warehouse.counts() == {AVAILABLE: 1, PROVISIONING: 2}
+
+    def test_leased_users_are_not_stock(self, warehouse):
+        warehouse.add("79000000001", "1111")
+        warehouse.lease()
+        assert warehouse.reserve_slot(1) is not None
+
+    def test_fill_and_cancel(self, warehouse):
+        filled, cancelled = warehouse.reserve_slot(2), warehouse.reserve_slot(2)
+        warehouse.fill_slot(filled, "79000000001", "1111", {})
+        warehouse.cancel_slot(cancelled)
+        warehouse.cancel_slot(filled)  # Заполненное место не удаляется
+        assert warehouse.counts() == {AVAILABLE: 1}
+
+    def test_expired_slot_is_dropped(self, warehouse):
+        slot = warehouse.reserve_slot(1)
+        assert warehouse.reserve_slot(1) is None
+        expire(warehouse, slot)
+        assert warehouse.reserve_slot(1) is not None
+        assert warehouse.counts() == {PROVISIONING: 1}
+
+
+class TestProvisioner:
+    """Тесты пополнения склада."""
+
+    def test_refill_to_target(self, warehouse):
+        phones = iter(["79000000001", "79000000002"])
+        provisioner = WarehouseProvisioner(warehouse, lambda: (next(phones), "1111", {}), target=2)
+        provisioner.refill()
+        assert provisioner.created == 2
+        assert warehouse.counts() == {AVAILABLE: 2}
+
+    def test_failed_fill_releases_slot(self, warehouse):
+        """Ошибка записи пользователя (телефон уже на складе) не оставляет место зарезервированным."""
+        warehouse.add("79000000001", "1111")
+        warehouse.lease()
+        provisioner = WarehouseProvisioner(warehouse, lambda: ("79000000001", "1111", {}), target=1)
+        provisioner.refill()
+        assert (provisioner.created, provisioner.failed) == (0, 1)
+        assert warehouse.counts() == {LEASED: 1}
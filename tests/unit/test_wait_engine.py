@@ -0,0 +1,46 @@
+import pytest
+from selenium.common import NoSuchElementException, TimeoutException
+
+from utils import wait_engine
+from utils.wait_engine import WaitEngine, WaitStats
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Интервалы опроса вместо реального ожидания."""
+    calls = []
+    monkeypatch.setattr(wait_engine.time, "sleep", calls.append)
+    return calls
+
+
+class TestWaitEngine:
+    """Тесты ожидания с экспоненциальным интервалом опроса."""
+
+    def test_backoff_up_to_max_poll(self, sleeps):
+        results = iter([None] * 5 + ["элемент"])
+        engine = WaitEngine(initial_poll=0.1, backoff=2, max_poll=0.5, stats=None)
+        assert engine.until(None, lambda driver: next(results), timeout=60) == "элемент"
+        assert sleeps == pytest.approx([0.1, 0.2, 0.4, 0.5, 0.5])
+
+    def test_first_check_without_sleep(self, sleeps):
+        assert WaitEngine(stats=None).until(None, lambda driver: True, timeout=1)
+        assert sleeps == []
+
+    def test_ignored_exceptions(self, sleeps):
+        results = iter([NoSuchElementException(), "элемент"])
+
+        def condition(driver):
+            result = next(results)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        assert WaitEngine(stats=None).until(None, condition, timeout=60) == "элемент"
+        assert len(sleeps) == 1
+
+    def test_timeout_records_stats(self, sleeps):
+        stats = WaitStats()
+        with pytest.raises(TimeoutException, match="нет кнопки"):
+            WaitEngine(stats=stats).until(None, lambda driver: False, timeout=0, message="нет кнопки", key="кнопка")
+        assert stats.snapshot()["кнопка"]["timeouts"] == 1
+        assert stats.snapshot()["кнопка"]["polls"] == 1
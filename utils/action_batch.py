@@ -0,0 +1,112 @@
+from typing import Callable, Dict, Optional, Tuple
+
+from selenium.webdriver.common.actions import interaction
+from selenium.webdriver.common.actions.action_builder import ActionBuilder
+from selenium.webdriver.common.actions.key_input import KeyInput
+from selenium.webdriver.common.actions.pointer_input import PointerInput
+
+Point = Tuple[int, int]
+
+
+class ActionBatch:
+    """
+    Пакет жестов и нажатий клавиш, отправляемый на устройство одним W3C-запросом (POST /actions).
+    Координаты элемента определяются один раз и переиспользуются для всех касаний по нему, поэтому
+    например ввод ПИН-кода из четырех касаний стоит один поиск элемента и один perform вместо восьми запросов.
+    Пример:
+        screen.actions().tap(screen.BUTTON_1, times=4).perform()
+    """
+
+    def __init__(self, driver, resolve: Callable[[Tuple[str, str]], object],
+                 on_perform: Optional[Callable[[], None]] = None):
+        """
+        :param driver: Драйвер.
+        :param resolve: Функция поиска элемента по локатору (с ожиданием).
+        :param on_perform: Вызывается после отправки пакета (например, сброс кеша экрана).
+        """
+        self.driver = driver
+        self._resolve = resolve
+        self._on_perform = on_perform
+        self._builder = ActionBuilder(driver, mouse=PointerInput(interaction.POINTER_TOUCH, "touch"),
+                                      keyboard=KeyInput("keyboard"))
+        self._points: Dict[Tuple[str, str], Point] = {}
+        self.steps = 0
+
+    @property
+    def _pointer(self):
+        return self._builder.pointer_action
+
+    @property
+    def _keys(self):
+        return self._builder.key_action
+
+    def _align(self, source_actions, other_input) -> None:
+        """
+        Выравнивает источник по числу тиков другого источника паузами: действия разных источников в одном
+        тике W3C выполняются одновременно, а пакет должен выполняться строго последовательно.
+        """
+        for _ in range(len(other_input.actions) - len(source_actions.source.actions)):
+            source_actions.pause(0)
+
+    def point(self, locator: Tuple[str, str]) -> Point:
+        """Центр элемента; определяется один раз на пакет."""
+        if locator not in self._points:
+            rect = self._resolve(locator).rect
+            self._points[locator] = (int(rect["x"] + rect["width"] / 2), int(rect["y"] + rect["height"] / 2))
+        return self._points[locator]
+
+    def tap(self, target, times: int = 1, interval: float = 0.1) -> "ActionBatch":
+        """
+        Касание элемента или точки экрана.
+        :param target: Локатор элемента или координаты (x, y).
+        :param times: Количество касаний.
+        :param interval: Пауза между касаниями, сек (даёт приложению обработать предыдущее касание).
+        """
+        x, y = self.point(target) if isinstance(target[0], str) else target
+        self._align(self._pointer, self._keys.source)
+        for index in range(times):
+            if index:
+                self._pointer.pause(interval)
+            self._pointer.move_to_location(x, y)
+            self._pointer.pointer_down()
+            self._pointer.pointer_up()
+        self.steps += times
+        return self
+
+    def keys(self, text: str) -> "ActionBatch":
+        """Нажатия клавиш (текст или значения selenium Keys) в элемент с фокусом."""
+        self._align(self._keys, self._pointer.source)
+        self._keys.send_keys(text)
+        self.steps += 1
+        return self
+
+    def swipe(self, start: Point, end: Point, hold: float = 0.5) -> "ActionBatch":
+        """
+        Свайп от точки start к точке end.
+        :param hold: Задержка после касания перед движением, сек.
+        """
+        self._align(self._pointer, self._keys.source)
+        self._pointer.move_to_location(*start)
+        self._pointer.pointer_down()
+        self._pointer.pause(hold)
+        self._pointer.move_to_location(*end)
+        self._pointer.pointer_up()
+        self.steps += 1
+        return self
+
+    def pause(self, seconds: float) -> "ActionBatch":
+        """Пауза между действиями пакета."""
+        self._align(self._pointer, self._keys.source)
+        self._pointer.pause(seconds)
+        return self
+
+    def perform(self) -> None:
+        """Отправка всего пакета одним запросом."""
+        if not self.steps:
+            return
+        try:
+            self._builder.perform()
+        finally:
+            self.steps = 0
+            if self._on_perform is not None:
+                self._on_perform()
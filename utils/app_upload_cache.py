@@ -0,0 +1,172 @@
+import hashlib
+import json
+import logging
+import os
+import socket
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import requests
+
+logger = logging.getLogger("Карта Жителя")
+
+DEFAULT_CACHE_FILE = Path(__file__).resolve().parent.parent / ".cache" / "app_uploads.json"
+
+
+class AppUploadCache:
+    """
+    Кеш загрузок APK в BrowserStack по хешу содержимого файла.
+    Локальный APK загружается один раз, полученный app_url (bs://...) сохраняется в файле кеша по SHA-256 сборки.
+    Последующие запуски используют app_url из кеша, пока BrowserStack подтверждает, что приложение еще хранится.
+    """
+    API_URL = "https://api-cloud.browserstack.com"
+
+    def __init__(self, user_name: str, access_key: str, cache_file: Path = DEFAULT_CACHE_FILE,
+                 api_url: str = API_URL, lock_timeout: float = 600):
+        """
+        :param user_name: Имя пользователя BrowserStack.
+        :param access_key: Ключ доступа BrowserStack.
+        :param cache_file: Файл кеша загрузок.
+        :param api_url: Адрес REST API App Automate.
+        :param lock_timeout: Сколько ждать, пока другой процесс загружает ту же сборку, сек.
+        """
+        self.auth = (user_name, access_key)
+        self.cache_file = cache_file
+        self.api_url = api_url.rstrip("/")
+        self.lock_timeout = lock_timeout
+        self._verified: Dict[str, str] = {}
+
+    @classmethod
+    def from_env(cls, user_name: str, access_key: str) -> "AppUploadCache":
+        """Кеш с настройками из переменных окружения APP_UPLOAD_CACHE и BS_API_URL."""
+        return cls(user_name, access_key,
+                   cache_file=Path(os.getenv("APP_UPLOAD_CACHE", DEFAULT_CACHE_FILE)),
+                   api_url=os.getenv("BS_API_URL", cls.API_URL))
+
+    def resolve(self, app_path: Optional[str]) -> Optional[str]:
+        """
+        Возвращает идентификатор приложения в BrowserStack для локального APK.
+        Значения, не являющиеся путем к существующему файлу (bs://..., custom_id), возвращаются без изменений.
+        :param app_path: Путь к APK или идентификатор уже загруженного приложения.
+        """
+        if not app_path or not Path(app_path).is_file():
+            return app_path
+        digest = self._file_digest(Path(app_path))
+        if digest in self._verified:
+            return self._verified[digest]
+
+        with self._locked():
+            cache = self._load()
+            entry = cache.get(digest)
+            available = self._is_available(entry) if entry else False
+            if available:
+                logger.info(f"APK {app_path} уже загружен в BrowserStack: {entry['app_url']}")
+            elif available is None:
+                logger.info(f"Используем {entry['app_url']} из кеша без подтверждения BrowserStack.")
+            else:
+                if entry:
+                    logger.info(f"Загрузка {entry['app_url']} больше не доступна в BrowserStack, загружаем заново.")
+                entry = self._upload(Path(app_path), digest)
+                cache[digest] = entry
+                self._save(cache)
+        self._verified[digest] = entry["app_url"]
+        return entry["app_url"]
+
+    @staticmethod
+    def _file_digest(path: Path) -> str:
+        sha256 = hashlib.sha256()
+        with path.open("rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def _is_available(self, entry: Dict[str, str]) -> Optional[bool]:
+        """
+        Проверяет, что BrowserStack еще хранит загруженное приложение.
+        :return: True/False по ответу recent_apps или None, если проверить не удалось (сеть, ошибка API):
+            временная ошибка не должна приводить к повторной загрузке.
+        """
+        try:
+            res = requests.get(f"{self.api_url}/app-automate/recent_apps/{entry['custom_id']}",
+                               auth=self.auth, timeout=30)
+            res.raise_for_status()
+            apps = res.json()
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"Не удалось проверить загрузку {entry['app_url']}: {e}")
+            return None
+        # Без загрузок с этим custom_id API отвечает объектом с сообщением вместо списка
+        return isinstance(apps, list) and any(app.get("app_url") == entry["app_url"] for app in apps)
+
+    def _upload(self, path: Path, digest: str) -> Dict[str, str]:
+        custom_id = f"resident-card-{digest[:16]}"
+        started = time.monotonic()
+        with path.open("rb") as f:
+            res = requests.post(f"{self.api_url}/app-automate/upload", auth=self.auth,
+                                files={"file": (path.name, f)}, data={"custom_id": custom_id}, timeout=600)
+        res.raise_for_status()
+        app_url = res.json()["app_url"]
+        logger.info(f"APK {path} загружен в BrowserStack за {time.monotonic() - started:.1f} с: {app_url}")
+        return {"app_url": app_url, "custom_id": custom_id, "file_name": path.name, "uploaded_at": int(time.time())}
+
+    def _load(self) -> Dict[str, Dict[str, str]]:
+        if not self.cache_file.exists():
+            return {}
+        try:
+            return json.loads(self.cache_file.read_text(encoding="utf-8"))
+        except ValueError:
+            logger.warning(f"Файл кеша загрузок {self.cache_file} поврежден, начинаем с пустого кеша.")
+            return {}
+
+    def _save(self, cache: Dict[str, Dict[str, str]]) -> None:
+        tmp_file = self.cache_file.with_suffix(".tmp")
+        tmp_file.write_text(json.dumps(cache, indent=2, ensure_ascii=False), encoding="utf-8")
+        tmp_file.replace(self.cache_file)
+
+    def _lock_is_stale(self, lock_file: Path) -> bool:
+        """
+        Блокировка брошена: процесс-владелец на этой машине завершился, а владелец с другой машины
+        (общий каталог кеша) не обновлял блокировку дольше lock_timeout.
+        """
+        try:
+            owner = lock_file.read_text(encoding="utf-8")
+            host, _, pid = owner.rpartition(":")
+            if host == socket.gethostname() and pid.isdigit():
+                os.kill(int(pid), 0)
+                return False
+            # Владелец на другой машине или файл еще не дописан: решаем по времени изменения
+            return time.time() - lock_file.stat().st_mtime > self.lock_timeout
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            return False  # Процесс жив, но принадлежит другому пользователю
+        except FileNotFoundError:
+            return False  # Блокировку уже сняли: следующий захват пройдет сам
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Межпроцессная блокировка, чтобы воркеры не загружали одну и ту же сборку параллельно."""
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        lock_file = self.cache_file.with_suffix(".lock")
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            try:
+                fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, f"{socket.gethostname()}:{os.getpid()}".encode())
+                break
+            except FileExistsError:
+                if time.monotonic() > deadline:
+                    if self._lock_is_stale(lock_file):
+                        logger.warning(f"Блокировка {lock_file} брошена завершившимся процессом, снимаем ее.")
+                        lock_file.unlink(missing_ok=True)
+                        continue
+                    logger.warning(f"Блокировка {lock_file} удерживается работающим процессом дольше "
+                                   f"{self.lock_timeout} с, продолжаем ждать.")
+                    deadline = time.monotonic() + self.lock_timeout
+                time.sleep(0.5)
+        try:
+            yield
+        finally:
+            os.close(fd)
+            lock_file.unlink(missing_ok=True)
@@ -0,0 +1,84 @@
+import logging
+import os
+import socket
+import time
+from typing import Optional
+
+import urllib3
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
+from appium.webdriver.appium_connection import AppiumConnection
+from selenium.webdriver.remote.client_config import ClientConfig
+
+from utils.metrics import CommandMetrics
+
+logger = logging.getLogger("Карта Жителя")
+
+
+class PooledAppiumConnection(AppiumConnection):
+    """
+    HTTP-транспорт Appium с настроенным пулом соединений urllib3, keep-alive и повторами идемпотентных команд.
+    Время каждой команды записывается в metrics.
+    """
+    # Команды, которые безопасно повторить при сетевой ошибке: они не меняют состояние приложения
+    IDEMPOTENT_COMMANDS = frozenset({
+        "findElement", "findElements", "findChildElement", "findChildElements",
+        "getElementText", "getElementAttribute", "getElementProperty", "getElementRect", "getElementTagName",
+        "isElementEnabled", "isElementDisplayed", "isElementSelected",
+        "getPageSource", "getWindowRect", "getContexts", "getCurrentContext", "getCurrentPackage",
+        "getCurrentActivity", "isKeyboardShown", "getSession", "getStatus", "getCapabilities",
+    })
+
+    def __init__(self, remote_server_addr: str, pool_maxsize: int = 4, retries: int = 2,
+                 retry_backoff: float = 0.5, timeout: Optional[int] = None):
+        """
+        :param remote_server_addr: Адрес Appium-сервера или хаба.
+        :param pool_maxsize: Количество keep-alive соединений в пуле на хост.
+        :param retries: Количество повторов идемпотентной команды и повторов установки соединения.
+        :param retry_backoff: Базовая пауза между повторами, сек (растет экспоненциально).
+        :param timeout: Таймаут HTTP-запроса, сек (None — значение Selenium по умолчанию).
+        """
+        self.pool_maxsize = pool_maxsize
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.metrics = CommandMetrics()
+        client_config = ClientConfig(remote_server_addr=remote_server_addr, keep_alive=True)
+        if timeout is not None:
+            client_config.timeout = timeout
+        super().__init__(client_config=client_config)
+
+    @classmethod
+    def from_env(cls, remote_server_addr: str) -> "PooledAppiumConnection":
+        """Транспорт с настройками из переменных APPIUM_POOL_MAXSIZE, APPIUM_COMMAND_RETRIES, APPIUM_HTTP_TIMEOUT."""
+        timeout = os.getenv("APPIUM_HTTP_TIMEOUT")
+        return cls(remote_server_addr,
+                   pool_maxsize=int(os.getenv("APPIUM_POOL_MAXSIZE", "4")),
+                   retries=int(os.getenv("APPIUM_COMMAND_RETRIES", "2")),
+                   timeout=int(timeout) if timeout else None)
+
+    def _get_connection_manager(self):
+        manager = super()._get_connection_manager()
+        manager.connection_pool_kw.update(
+            maxsize=self.pool_maxsize,
+            block=False,
+            # Повторяется только установка соединения: запрос до сервера еще не дошел, повтор безопасен
+            retries=Retry(connect=self.retries, read=0, redirect=3, status=0, other=0,
+                          backoff_factor=self.retry_backoff),
+            socket_options=HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)],
+        )
+        return manager
+
+    def execute(self, command, params):
+        attempts = self.retries + 1 if command in self.IDEMPOTENT_COMMANDS else 1
+        for attempt in range(1, attempts + 1):
+            started = time.perf_counter()
+            try:
+                # execute() удаляет из params подставленные в URL значения, поэтому на каждую попытку — копия
+                return super().execute(command, dict(params) if isinstance(params, dict) else params)
+            except (urllib3.exceptions.HTTPError, ConnectionError) as e:
+                if attempt == attempts:
+                    raise
+                logger.warning(f"Сетевая ошибка при выполнении {command}, повтор {attempt}/{self.retries}: {e}")
+                time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+            finally:
+                self.metrics.record(command, time.perf_counter() - started)
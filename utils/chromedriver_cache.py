@@ -0,0 +1,95 @@
+import json
+import logging
+import os
+import re
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("Карта Жителя")
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "chromedriver"
+
+_VERSION_PATTERN = re.compile(r"ChromeDriver (?P<major>\d+)\.(?P<rest>\d+\.\d+\.\d+)")
+
+
+class ChromedriverCache:
+    """
+    Локальный каталог chromedriver разных версий для локального Appium-сервера.
+    Appium выбирает из каталога chromedriver под версию WebView устройства по файлу соответствия версий,
+    поэтому при первом переключении в WebView не тратится время на поиск и загрузку chromedriver.
+    Файл соответствия строится по самим бинарникам (chromedriver --version): начиная со 115 версии мажорная
+    версия chromedriver совпадает с мажорной версией Chrome/WebView.
+    На BrowserStack chromedriver подбирается на стороне сервиса, каталог не используется.
+    """
+
+    MAPPING_FILE = "mapping.json"
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR):
+        """
+        :param cache_dir: Каталог с исполняемыми файлами chromedriver (имя начинается с 'chromedriver').
+        """
+        self.cache_dir = Path(cache_dir)
+
+    @classmethod
+    def from_env(cls) -> "ChromedriverCache":
+        """Каталог из переменной окружения CHROMEDRIVER_DIR (по умолчанию .cache/chromedriver в корне репозитория)."""
+        return cls(Path(os.getenv("CHROMEDRIVER_DIR", DEFAULT_CACHE_DIR)))
+
+    def executables(self) -> List[Path]:
+        if not self.cache_dir.is_dir():
+            return []
+        return sorted(path for path in self.cache_dir.iterdir()
+                      if path.name.startswith("chromedriver") and path.is_file() and os.access(path, os.X_OK))
+
+    def build_mapping(self) -> Dict[str, str]:
+        """Соответствие версии chromedriver минимальной версии Chrome/WebView."""
+        mapping = {}
+        for path in self.executables():
+            try:
+                output = subprocess.run([str(path), "--version"], capture_output=True, text=True,
+                                        timeout=10).stdout
+            except (OSError, subprocess.SubprocessError) as e:
+                logger.warning(f"Не удалось определить версию {path}: {e}")
+                continue
+            match = _VERSION_PATTERN.search(output)
+            if match:
+                mapping[f"{match.group('major')}.{match.group('rest')}"] = f"{match.group('major')}.0.0"
+        return mapping
+
+    def _mapping_is_fresh(self, path: Path) -> bool:
+        """Файл соответствия не старше каталога и бинарников: набор chromedriver после его записи не менялся."""
+        try:
+            mapping_mtime = path.stat().st_mtime
+            return all(mapping_mtime >= candidate.stat().st_mtime
+                       for candidate in [self.cache_dir, *self.executables()])
+        except OSError:
+            return False
+
+    def write_mapping(self) -> Optional[Path]:
+        """
+        Записывает файл соответствия версий. Бинарники запускаются, только если каталог или chromedriver в нем
+        изменились после записи файла; иначе используется уже записанный файл.
+        """
+        path = self.cache_dir / self.MAPPING_FILE
+        if self._mapping_is_fresh(path):
+            return path
+        mapping = self.build_mapping()
+        if not mapping:
+            return None
+        if not path.exists() or json.loads(path.read_text(encoding="utf-8")) != mapping:
+            path.write_text(json.dumps(mapping, indent=2, sort_keys=True), encoding="utf-8")
+        else:
+            path.touch()  # Набор не изменился: отмечаем файл актуальным
+        return path
+
+    def capabilities(self) -> Dict[str, object]:
+        """Capabilities Appium для выбора chromedriver из каталога; пустой словарь, если каталог пуст."""
+        mapping_file = self.write_mapping()
+        if mapping_file is None:
+            return {}
+        logger.info(f"Используем chromedriver из {self.cache_dir}: {', '.join(json.loads(mapping_file.read_text()))}")
+        return {
+            "appium:chromedriverExecutableDir": str(self.cache_dir.resolve()),
+            "appium:chromedriverChromeMappingFile": str(mapping_file.resolve()),
+        }
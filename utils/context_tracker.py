@@ -0,0 +1,177 @@
+import logging
+import threading
+import time
+import weakref
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from appium.common.exceptions import NoSuchContextException
+
+logger = logging.getLogger("Карта Жителя")
+
+NATIVE_CONTEXT = "NATIVE_APP"
+
+
+class ContextSwitchStats:
+    """Статистика переключений контекста: количество и время реальных переключений, пропущенные переключения."""
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, float]] = defaultdict(lambda: {"switches": 0, "seconds": 0.0, "max": 0.0})
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, seconds: float) -> None:
+        with self._lock:
+            stats = self._stats[kind]
+            stats["switches"] += 1
+            stats["seconds"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+
+    def record_skipped(self) -> None:
+        with self._lock:
+            self.skipped += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self.skipped = 0
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {kind: dict(stats) for kind, stats in self._stats.items()}
+
+    def format_report(self) -> str:
+        lines = [f"{'переключений':>13}{'сек':>9}{'сред.':>8}{'макс.':>8}  контекст"]
+        for kind, stats in sorted(self.snapshot().items()):
+            lines.append(f"{stats['switches']:>13}{stats['seconds']:>9.1f}{stats['seconds'] / stats['switches']:>8.2f}"
+                         f"{stats['max']:>8.2f}  {kind}")
+        lines.append(f"Пропущено переключений в текущий контекст: {self.skipped}")
+        return "\n".join(lines)
+
+
+# Общая статистика переключений контекста процесса, выводится в лог в конце прогона
+context_stats = ContextSwitchStats()
+
+
+class ContextTracker:
+    """
+    Текущий контекст драйвера (NATIVE_APP или WEBVIEW_*) и закешированный список контекстов.
+    Один трекер на драйвер, общий для всех экранов: переключение в текущий контекст не отправляется на сервер,
+    а каждое реальное переключение увеличивает generation, по которому экраны сбрасывают закешированные элементы.
+    """
+
+    _trackers: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+    _trackers_lock = threading.Lock()
+
+    def __init__(self, driver, stats: Optional[ContextSwitchStats] = context_stats):
+        self._driver = weakref.ref(driver)
+        self.stats = stats
+        self._current: Optional[str] = None
+        self._contexts: Optional[List[str]] = None
+        self._webview_attached = False
+        self.generation = 0
+
+    @classmethod
+    def for_driver(cls, driver) -> "ContextTracker":
+        """Трекер драйвера; создается при первом обращении."""
+        with cls._trackers_lock:
+            tracker = cls._trackers.get(driver)
+            if tracker is None:
+                tracker = cls._trackers[driver] = cls(driver)
+            return tracker
+
+    @property
+    def driver(self):
+        return self._driver()
+
+    @property
+    def current(self) -> str:
+        """Текущий контекст; запрашивается у сервера только если неизвестен."""
+        if self._current is None:
+            self._current = self.driver.current_context
+        return self._current
+
+    @property
+    def is_native(self) -> bool:
+        return self.current == NATIVE_CONTEXT
+
+    def contexts(self, refresh: bool = False) -> List[str]:
+        """Список доступных контекстов (кешируется до refresh или invalidate)."""
+        if self._contexts is None or refresh:
+            self._contexts = list(self.driver.contexts)
+        return self._contexts
+
+    @staticmethod
+    def _preferred_webview(web_views: List[str]) -> str:
+        return "WEBVIEW_chrome" if "WEBVIEW_chrome" in web_views else web_views[0]
+
+    def webview_name(self) -> str:
+        """
+        Имя WebView-контекста: 'WEBVIEW_chrome', если он доступен, иначе первый найденный WebView.
+        Если в закешированном списке нет WebView, список запрашивается заново:
+        WebView появляется только после открытия страницы.
+        """
+        for refresh in (False, True):
+            web_views = [context for context in self.contexts(refresh) if "WEBVIEW" in context]
+            if web_views:
+                return self._preferred_webview(web_views)
+        raise RuntimeError("WebView не найдено!")
+
+    def switch(self, name: str, kind: Optional[str] = None) -> bool:
+        """
+        Переключение контекста.
+        Первое подключение к WebView в сессии (запуск chromedriver) учитывается в статистике отдельно от повторных.
+        :param name: Имя контекста.
+        :param kind: Категория переключения в статистике (по умолчанию определяется по контексту).
+        :return: True, если переключение выполнено; False, если драйвер уже был в этом контексте.
+        """
+        if self.current == name:
+            if self.stats is not None:
+                self.stats.record_skipped()
+            return False
+        started = time.monotonic()
+        try:
+            self.driver.switch_to.context(name)
+        except NoSuchContextException:
+            self._contexts = None
+            self._current = None
+            raise
+        finally:
+            self.generation += 1
+        elapsed = time.monotonic() - started
+        self._current = name
+        if kind is None:
+            if name == NATIVE_CONTEXT:
+                kind = NATIVE_CONTEXT
+            else:
+                kind = "WEBVIEW" if self._webview_attached else "WEBVIEW (подключение по требованию)"
+        if name != NATIVE_CONTEXT:
+            self._webview_attached = True
+        if self.stats is not None:
+            self.stats.record(kind, elapsed)
+        logger.info(f"Переключение в контекст {name} за {elapsed:.2f} сек.")
+        return True
+
+    def warm_up(self) -> bool:
+        """
+        Прогрев WebView: подключение к уже открытому WebView и возврат в исходный контекст.
+        Chromedriver запускается заранее, пока тест ждет нативные экраны, и последующее переключение
+        в WebView не тратит время на его запуск.
+        :return: True, если подключение выполнено; False, если WebView еще нет или подключение уже было.
+        """
+        if self._webview_attached:
+            return False
+        web_views = [context for context in self.contexts(refresh=True) if "WEBVIEW" in context]
+        if not web_views:
+            return False
+        previous = self.current
+        self.switch(self._preferred_webview(web_views), kind="WEBVIEW (прогрев)")
+        self.switch(previous)
+        return True
+
+    def invalidate(self) -> None:
+        """Сброс известного состояния (например, после перезапуска приложения в переиспользуемой сессии)."""
+        self._current = None
+        self._contexts = None
+        self._webview_attached = False
+        self.generation += 1
@@ -0,0 +1,53 @@
+import os
+from typing import Dict, List, Optional
+
+
+def _split_env_list(name: str) -> List[str]:
+    """Разбивает значение переменной окружения по запятым."""
+    return [value.strip() for value in (os.getenv(name) or "").split(",") if value.strip()]
+
+
+def devices_from_env() -> List[Dict[str, Optional[str]]]:
+    """
+    Список устройств из переменных окружения CI.
+    BS_DEVICE_NAME и BS_PLATFORM_VERSION могут содержать несколько значений через запятую:
+    BS_DEVICE_NAME="Google Pixel 6 Pro,Samsung Galaxy S23", BS_PLATFORM_VERSION="15.0,13.0".
+    Если версия платформы одна, она используется для всех устройств; если не задана — версия не указывается.
+    """
+    names = _split_env_list("BS_DEVICE_NAME")
+    versions = _split_env_list("BS_PLATFORM_VERSION")
+    if not names:
+        return [{"device_name": None, "platform_version": versions[0] if versions else None}]
+    if not versions:
+        versions = [None] * len(names)
+    elif len(versions) == 1:
+        versions = versions * len(names)
+    if len(versions) != len(names):
+        raise ValueError("Количество значений в BS_PLATFORM_VERSION не совпадает с количеством устройств "
+                         "в BS_DEVICE_NAME")
+    return [{"device_name": name, "platform_version": version} for name, version in zip(names, versions)]
+
+
+def devices_from_platforms(platforms: List[Dict[str, str]]) -> List[Dict[str, Optional[str]]]:
+    """
+    Список устройств из секции platforms файла browserstack.yml.
+    :param platforms: Значение ключа platforms.
+    """
+    devices = [{"device_name": platform.get("deviceName"), "platform_version": platform.get("platformVersion")}
+               for platform in platforms or []]
+    return devices or [{"device_name": None, "platform_version": None}]
+
+
+def worker_index() -> int:
+    """Порядковый номер воркера pytest-xdist (gw0, gw1, ...). Без xdist возвращает 0."""
+    worker = os.getenv("PYTEST_XDIST_WORKER", "gw0")
+    return int(worker[2:]) if worker.startswith("gw") and worker[2:].isdigit() else 0
+
+
+def device_for_worker(devices: List[Dict[str, Optional[str]]]) -> Dict[str, Optional[str]]:
+    """
+    Закрепляет устройство за текущим воркером: воркер gwN всегда получает устройство N (по модулю длины списка),
+    поэтому сессии воркера всегда создаются на одном и том же устройстве.
+    :param devices: Список устройств пула.
+    """
+    return devices[worker_index() % len(devices)]
@@ -0,0 +1,53 @@
+import logging
+from typing import Dict, Optional, Tuple
+
+from selenium.webdriver.remote.webelement import WebElement
+
+logger = logging.getLogger("Карта Жителя")
+
+
+class ElementCache:
+    """
+    Кеш найденных элементов экрана по локатору.
+    Позволяет не искать повторно один и тот же элемент, когда шаг сначала ждет элемент, затем читает его текст
+    для лога и для проверки. Кеш сбрасывается действиями, которые меняют экран (клик, ввод, свайп, «назад»),
+    и переключением контекста; устаревший элемент удаляется из кеша при StaleElementReferenceException.
+    """
+
+    def __init__(self):
+        self._elements: Dict[Tuple[str, str], WebElement] = {}
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.invalidations = 0
+
+    def get(self, locator: Tuple[str, str]) -> Optional[WebElement]:
+        element = self._elements.get(locator)
+        if element is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return element
+
+    def put(self, locator: Tuple[str, str], element: WebElement) -> None:
+        self._elements[locator] = element
+
+    def discard_stale(self, locator: Tuple[str, str]) -> None:
+        """Удаляет элемент, ссылка на который устарела."""
+        if self._elements.pop(locator, None) is not None:
+            self.stale += 1
+
+    def invalidate(self) -> None:
+        """Сбрасывает кеш после действия, которое может изменить экран."""
+        if self._elements:
+            self._elements.clear()
+            self.invalidations += 1
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self) -> str:
+        return (f"Кеш элементов: попаданий {self.hits}, промахов {self.misses} ({self.hit_rate:.0%}), "
+                f"устаревших {self.stale}, сбросов {self.invalidations}.")
@@ -0,0 +1,56 @@
+import logging
+from collections import Counter
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+logger = logging.getLogger("Карта Жителя")
+
+
+class Interrupt(NamedTuple):
+    """Известный попап, который может появиться в любой момент, и способ его закрыть."""
+    name: str
+    locator: Tuple[str, str]
+    handler: Callable[[], None]
+
+
+class InterruptRegistry:
+    """
+    Реестр обработчиков попапов (обновление приложения, реклама и т.д.).
+    Обработчики проверяются по снимку экрана во время ожиданий, поэтому попап закрывается, когда бы он ни появился,
+    а не только в фиксированных точках сценария.
+    """
+
+    def __init__(self):
+        self._interrupts: List[Interrupt] = []
+        self.handled = Counter()
+
+    def register(self, name: str, locator: Tuple[str, str], handler: Callable[[], None]) -> None:
+        """
+        Регистрация обработчика попапа.
+        :param name: Имя попапа для лога.
+        :param locator: Локатор, по которому попап распознается на снимке экрана (AppiumBy.XPATH или AppiumBy.ID).
+        :param handler: Функция, закрывающая попап.
+        """
+        self._interrupts = [interrupt for interrupt in self._interrupts if interrupt.name != name]
+        self._interrupts.append(Interrupt(name, locator, handler))
+
+    def __bool__(self) -> bool:
+        return bool(self._interrupts)
+
+    @property
+    def locators(self) -> List[Tuple[str, str]]:
+        return [interrupt.locator for interrupt in self._interrupts]
+
+    def handle(self, snapshot, exclude: Sequence[Tuple[str, str]] = ()) -> Optional[str]:
+        """
+        Закрывает первый найденный на снимке попап.
+        :param snapshot: Снимок экрана (PageSnapshot).
+        :param exclude: Локаторы попапов, которые не закрываются.
+        :return: Имя закрытого попапа или None, если попапов нет.
+        """
+        for interrupt in self._interrupts:
+            if interrupt.locator not in exclude and snapshot.exists(interrupt.locator):
+                logger.info(f"Найден попап '{interrupt.name}', закрываем его.")
+                interrupt.handler()
+                self.handled[interrupt.name] += 1
+                return interrupt.name
+        return None
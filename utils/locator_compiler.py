@@ -0,0 +1,109 @@
+import os
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+from appium.webdriver.common.appiumby import AppiumBy
+
+# (//android.widget.TextView[...])[2] или //android.widget.TextView[...]
+_XPATH_PATTERN = re.compile(
+    r'^(?:\((?P<grouped>//(?P<gclass>[\w.*]+)\[(?P<gpreds>.+)\])\)\[(?P<index>\d+)\]'
+    r'|//(?P<cls>[\w.*]+)\[(?P<preds>.+)\])$'
+)
+_VALUE = r'(?:"(?P<{0}d>[^"]*)"|\'(?P<{0}s>[^\']*)\')'
+_PREDICATE_PATTERN = re.compile(
+    r'^(?:@(?P<attr>resource-id|text|content-desc)\s*=\s*' + _VALUE.format("v1") +
+    r'|contains\(\s*@(?P<cattr>text|content-desc)\s*,\s*' + _VALUE.format("v2") + r'\s*\))$'
+)
+# Условия с такими подстроками вне кавычек (вложенные пути, or) не переводятся: поиск остается по XPath
+_UNSUPPORTED_IN_PREDICATES = ("]", "/", " or ")
+_QUOTED_VALUE = re.compile(r'"[^"]*"|\'[^\']*\'')
+_UI_SELECTOR_METHODS = {
+    "resource-id": "resourceId",
+    "text": "text",
+    "content-desc": "description",
+}
+_UI_SELECTOR_CONTAINS_METHODS = {
+    "text": "textContains",
+    "content-desc": "descriptionContains",
+}
+
+
+class CompiledLocator(NamedTuple):
+    """Результат компиляции: быстрый локатор и исходный XPath для запасного поиска."""
+    primary: Tuple[str, str]
+    fallback: Optional[Tuple[str, str]]
+
+
+def _quote(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _split_predicates(predicates: str):
+    """Разбивает условия XPath по ' and ' вне кавычек."""
+    parts, current, quote = [], "", None
+    index = 0
+    while index < len(predicates):
+        char = predicates[index]
+        if quote:
+            quote = None if char == quote else quote
+        elif char in "\"'":
+            quote = char
+        elif predicates.startswith(" and ", index):
+            parts.append(current.strip())
+            current, index = "", index + len(" and ")
+            continue
+        current += char
+        index += 1
+    parts.append(current.strip())
+    return parts
+
+
+def _to_ui_selector(class_name: str, predicates: str, index: Optional[int]) -> Optional[Tuple[str, str]]:
+    if "." not in class_name and class_name != "*":
+        return None  # Теги HTML (WebView) не компилируются
+    unquoted = _QUOTED_VALUE.sub('""', predicates)
+    if any(part in unquoted for part in _UNSUPPORTED_IN_PREDICATES):
+        return None
+    calls = []
+    if class_name != "*":
+        calls.append(f"className({_quote(class_name)})")
+    for predicate in _split_predicates(predicates):
+        match = _PREDICATE_PATTERN.match(predicate)
+        if not match:
+            return None
+        # //*[@resource-id="..."] не заменяется на AppiumBy.ID: UiAutomator2 дописывает к id без пакета имя пакета
+        if match.group("attr"):
+            value = match.group("v1d") if match.group("v1d") is not None else match.group("v1s")
+            calls.append(f"{_UI_SELECTOR_METHODS[match.group('attr')]}({_quote(value)})")
+        else:
+            value = match.group("v2d") if match.group("v2d") is not None else match.group("v2s")
+            calls.append(f"{_UI_SELECTOR_CONTAINS_METHODS[match.group('cattr')]}({_quote(value)})")
+    if index is not None:
+        calls.append(f"instance({index - 1})")
+    return AppiumBy.ANDROID_UIAUTOMATOR, "new UiSelector()." + ".".join(calls)
+
+
+@lru_cache(maxsize=None)
+def compile_locator(locator: Tuple[str, str]) -> CompiledLocator:
+    """
+    Переводит XPath-локатор нативного экрана в ANDROID_UIAUTOMATOR, если это эквивалентно.
+    Поддерживаются выражения вида //класс[условия] и (//класс[условия])[N], где условия — @resource-id, @text,
+    @content-desc (точное совпадение), contains(@text, ...), объединенные через and.
+    Остальные локаторы (вложенные пути, or, HTML-теги WebView) возвращаются без изменений.
+    Результат кешируется, поэтому одинаковые локаторы разных экранов компилируются один раз.
+    :param locator: Исходный локатор.
+    """
+    by, value = locator
+    if by != AppiumBy.XPATH or os.getenv("LOCATOR_COMPILER", "true") != "true":
+        return CompiledLocator(locator, None)
+    match = _XPATH_PATTERN.match(value.strip())
+    if not match:
+        return CompiledLocator(locator, None)
+    if match.group("grouped"):
+        compiled = _to_ui_selector(match.group("gclass"), match.group("gpreds"), int(match.group("index")))
+    else:
+        compiled = _to_ui_selector(match.group("cls"), match.group("preds"), None)
+    if compiled is None:
+        return CompiledLocator(locator, None)
+    return CompiledLocator(compiled, locator)
@@ -0,0 +1,118 @@
+import base64
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+import zipfile
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from utils.context_tracker import ContextTracker
+
+logger = logging.getLogger("Карта Жителя")
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "login_state"
+
+
+def app_id(driver) -> str:
+    """Пакет тестируемого приложения."""
+    return driver.capabilities.get("appPackage") or driver.current_package
+
+
+class LoginStateCache:
+    """
+    Кеш авторизованного состояния приложения по пользователю и устройству.
+    После первой авторизации пользователя каталоги данных приложения (по умолчанию shared_prefs) забираются
+    с устройства через pull_folder('@пакет/...'), а перед следующими тестами этого пользователя записываются обратно
+    через push_file при остановленном приложении. Требуется отладочная сборка приложения (доступ run-as).
+    Проверка восстановленного состояния и переход к обычной авторизации выполняются в MainScreen.
+    """
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR, folders: Tuple[str, ...] = ("shared_prefs",),
+                 ttl: float = 12 * 3600):
+        """
+        :param cache_dir: Каталог сохраненных состояний.
+        :param folders: Каталоги данных приложения (относительно /data/data/<пакет>), которые сохраняются.
+        :param ttl: Срок жизни сохраненного состояния, сек (токены авторизации истекают).
+        """
+        self.cache_dir = Path(cache_dir)
+        self.folders = folders
+        self.ttl = ttl
+        self.restored = 0
+        self.failed = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["LoginStateCache"]:
+        """
+        Кеш с настройками из окружения или None, если он не включен.
+        LOGIN_STATE_CACHE=true — включить; LOGIN_STATE_DIR — каталог; LOGIN_STATE_FOLDERS — каталоги данных
+        приложения через запятую; LOGIN_STATE_TTL — срок жизни состояния, сек.
+        """
+        if os.getenv("LOGIN_STATE_CACHE") != "true":
+            return None
+        folders = tuple(folder.strip() for folder in os.getenv("LOGIN_STATE_FOLDERS", "shared_prefs").split(",")
+                        if folder.strip())
+        return cls(cache_dir=Path(os.getenv("LOGIN_STATE_DIR", DEFAULT_CACHE_DIR)), folders=folders,
+                   ttl=float(os.getenv("LOGIN_STATE_TTL", str(12 * 3600))))
+
+    def _path(self, driver, phone: str) -> Path:
+        capabilities = driver.capabilities
+        device = f"{capabilities.get('deviceName')}|{capabilities.get('platformVersion')}"
+        key = hashlib.sha256(f"{app_id(driver)}|{phone}|{device}".encode("utf-8")).hexdigest()[:16]
+        return self.cache_dir / f"{key}.json"
+
+    def _load(self, path: Path) -> Optional[Dict]:
+        try:
+            state = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if time.time() - state.get("created", 0) > self.ttl:
+            path.unlink(missing_ok=True)
+            return None
+        return state
+
+    def save(self, driver, phone: str) -> None:
+        """Сохраняет данные авторизованного приложения для пользователя."""
+        package = app_id(driver)
+        state = {"created": time.time(), "folders": {}}
+        for folder in self.folders:
+            state["folders"][folder] = driver.pull_folder(f"@{package}/{folder}")
+        path = self._path(driver, phone)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(state), encoding="utf-8")
+        os.replace(tmp_path, path)
+        logger.info(f"Состояние авторизации пользователя {phone} сохранено: {path.name}.")
+
+    def restore(self, driver, phone: str) -> bool:
+        """
+        Записывает сохраненные данные в остановленное приложение и запускает его.
+        :return: False, если сохраненного состояния нет.
+        """
+        state = self._load(self._path(driver, phone))
+        if state is None:
+            return False
+        package = app_id(driver)
+        driver.terminate_app(package)
+        for folder, archive in state["folders"].items():
+            with zipfile.ZipFile(io.BytesIO(base64.b64decode(archive))) as zip_file:
+                for entry in zip_file.infolist():
+                    if entry.is_dir():
+                        continue
+                    # В архиве pull_folder пути могут начинаться с имени самого каталога
+                    name = entry.filename[len(folder) + 1:] if entry.filename.startswith(f"{folder}/") \
+                        else entry.filename
+                    driver.push_file(f"@{package}/{folder}/{name}",
+                                     base64.b64encode(zip_file.read(entry)).decode("ascii"))
+        driver.activate_app(package)
+        ContextTracker.for_driver(driver).invalidate()
+        return True
+
+    def discard(self, driver, phone: str) -> None:
+        """Удаляет состояние, которое не удалось восстановить."""
+        self._path(driver, phone).unlink(missing_ok=True)
+
+    def summary(self) -> str:
+        return f"Кеш авторизации: восстановлено {self.restored}, неудачных восстановлений {self.failed}."
@@ -0,0 +1,55 @@
+import math
+import threading
+from collections import defaultdict
+from typing import Dict, List
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """
+    Перцентиль по методу ближайшего ранга.
+    :param values: Отсортированный по возрастанию список значений.
+    :param percent: Перцентиль от 0 до 100.
+    """
+    if not values:
+        return 0.0
+    rank = max(math.ceil(percent / 100 * len(values)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+class CommandMetrics:
+    """Время выполнения Appium-команд или запросов API (round trip) с группировкой по имени команды."""
+
+    def __init__(self):
+        self._durations: Dict[str, List[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def record(self, command: str, duration: float) -> None:
+        with self._lock:
+            self._durations[command].append(duration)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._durations.clear()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Сводка по командам: количество вызовов, p50 и p95 времени выполнения в миллисекундах.
+        :return: Словарь {имя команды: {"count": ..., "p50_ms": ..., "p95_ms": ...}}.
+        """
+        with self._lock:
+            durations = {command: sorted(values) for command, values in self._durations.items()}
+        return {
+            command: {
+                "count": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+            }
+            for command, values in sorted(durations.items(), key=lambda item: -sum(item[1]))
+        }
+
+    def format_summary(self, title: str = "команда") -> str:
+        """Сводка в виде таблицы для лога."""
+        lines = [f"{title:<28}{'кол-во':>8}{'p50, мс':>10}{'p95, мс':>10}"]
+        for command, stats in self.summary().items():
+            lines.append(f"{command:<28}{stats['count']:>8}{stats['p50_ms']:>10}{stats['p95_ms']:>10}")
+        return "\n".join(lines)
@@ -0,0 +1,53 @@
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from lxml import etree
+from appium.webdriver.common.appiumby import AppiumBy
+
+
+@lru_cache(maxsize=None)
+def _compile_xpath(xpath: str) -> etree.XPath:
+    """Скомпилированное XPath-выражение, общее для всех снимков."""
+    return etree.XPath(xpath)
+
+
+class PageSnapshot:
+    """
+    Снимок иерархии нативного экрана (driver.page_source), по которому локаторы вычисляются локально.
+    Позволяет прочитать тексты и атрибуты нескольких элементов за один запрос к устройству.
+    Поддерживаются локаторы AppiumBy.XPATH и AppiumBy.ID.
+    """
+
+    def __init__(self, page_source: str):
+        """
+        :param page_source: XML иерархии экрана, полученный из driver.page_source в нативном контексте.
+        """
+        self.tree = etree.fromstring(page_source.encode("utf-8"))
+
+    def find_all(self, locator: Tuple[str, str]) -> List[etree._Element]:
+        """
+        Все узлы, соответствующие локатору.
+        :param locator: Локатор элемента.
+        """
+        by, value = locator
+        if by == AppiumBy.ID:
+            return self.tree.xpath("//*[@resource-id=$value]", value=value)
+        if by != AppiumBy.XPATH:
+            raise ValueError(f"Локатор {locator} не поддерживается снимком экрана")
+        return [node for node in _compile_xpath(value)(self.tree) if isinstance(node, etree._Element)]
+
+    def exists(self, locator: Tuple[str, str]) -> bool:
+        return bool(self.find_all(locator))
+
+    def attribute(self, locator: Tuple[str, str], name: str) -> Optional[str]:
+        """
+        Значение атрибута первого найденного узла или None, если узел не найден.
+        :param locator: Локатор элемента.
+        :param name: Имя атрибута (text, resource-id, enabled, displayed и т.д.).
+        """
+        nodes = self.find_all(locator)
+        return nodes[0].get(name) if nodes else None
+
+    def text(self, locator: Tuple[str, str]) -> Optional[str]:
+        """Текст первого найденного узла или None, если узел не найден."""
+        return self.attribute(locator, "text")
@@ -0,0 +1,117 @@
+import logging
+import os
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+import pytest
+
+logger = logging.getLogger("Карта Жителя")
+
+# Фикстуры-префиксы: состояние приложения после них одинаково для всех использующих их тестов
+PREFIX_FIXTURES = ("issue_plastic_card",)
+
+
+def prefix_sharing_enabled() -> bool:
+    """Совместное выполнение префиксов включается PREFIX_SHARING=true (вместе с SESSION_REUSE=true)."""
+    return os.getenv("PREFIX_SHARING") == "true"
+
+
+def prefix_key(item: pytest.Item) -> Optional[Tuple[Hashable, ...]]:
+    """
+    Ключ общего префикса теста или None, если тест выполняется изолированно.
+    Тесты с параметром фикстуры-префикса (indirect=True — пользователь расходуется) и тесты самого пути
+    до экрана (маркер click_navigation) не делят префикс с другими.
+    """
+    if item.get_closest_marker("click_navigation") is not None:
+        return None
+    callspec = getattr(item, "callspec", None)
+    for name in PREFIX_FIXTURES:
+        if name in getattr(item, "fixturenames", ()):
+            if callspec is not None and callspec.params.get(name):
+                return None
+            return (name,)
+    return None
+
+
+def group_by_prefix(items: List[pytest.Item]) -> List[pytest.Item]:
+    """
+    Переупорядочивает тесты так, чтобы тесты с общим префиксом шли подряд.
+    Группы идут в порядке первого теста группы, порядок внутри группы сохраняется.
+    Для распределения группы на один воркер добавляется маркер xdist_group (работает с --dist loadgroup).
+    """
+    groups: Dict[Hashable, List[pytest.Item]] = {}
+    for index, item in enumerate(items):
+        key = prefix_key(item)
+        group = key if key is not None else ("isolated", index)
+        groups.setdefault(group, []).append(item)
+        if key is not None:
+            item.add_marker(pytest.mark.xdist_group(name="prefix-" + "-".join(map(str, key))))
+    return [item for group in groups.values() for item in group]
+
+
+class CheckpointRegistry:
+    """
+    Контрольная точка общего префикса на воркере.
+    После выполнения префикса (авторизация и переход на экран 'Выдача карты') точка сохраняется; следующий тест
+    с тем же префиксом не сбрасывает приложение, а возвращается к точке навигацией. После каждого теста точка
+    сохраняется, только если приложение удалось вернуть к ней сразу (навигатором завершившегося теста, который знает
+    открытый экран); иначе, как и при неудачном возврате, точка сбрасывается, и тест выполняется изолированно:
+    сброс приложения и полный префикс.
+    """
+
+    def __init__(self):
+        self._key: Optional[Tuple[Hashable, ...]] = None
+        self._valid = False
+        self.built = 0
+        self.resumed = 0
+        self.fallbacks = 0
+        self.recovered = 0
+
+    def can_resume(self, item: pytest.Item) -> bool:
+        """Можно ли продолжить тест с контрольной точки (решается до сброса приложения в пуле сессий)."""
+        key = prefix_key(item)
+        return self._valid and key is not None and key == self._key
+
+    def resume(self, item: pytest.Item, restore: Callable[[], None]) -> bool:
+        """
+        Возврат к контрольной точке.
+        :param item: Текущий тест.
+        :param restore: Действие, возвращающее приложение к точке (например, навигация на экран префикса).
+        :return: True, если префикс выполнять не нужно.
+        """
+        if not self.can_resume(item):
+            return False
+        try:
+            restore()
+        except Exception as e:
+            logger.warning(f"Не удалось вернуться к контрольной точке {self._key}, выполняем тест изолированно: {e}")
+            self.fallbacks += 1
+            self._valid = False
+            return False
+        self.resumed += 1
+        logger.info(f"Тест {item.name} продолжен с контрольной точки {self._key}.")
+        return True
+
+    def save(self, item: pytest.Item) -> None:
+        """Сохранение точки после выполнения префикса."""
+        self._key = prefix_key(item)
+        self._valid = self._key is not None
+        self.built += self._valid
+
+    def finish(self, item: pytest.Item, failed: bool, recover: Optional[Callable[[], bool]] = None) -> bool:
+        """
+        Завершение теста: тест другого префикса или неудачный возврат к точке делают ее недействительной.
+        :param item: Завершившийся тест.
+        :param failed: Тест упал.
+        :param recover: Возврат приложения к точке после теста; True, если возврат удался.
+        :return: True, если точка действительна и приложение не нужно сбрасывать.
+        """
+        if prefix_key(item) != self._key:
+            self._valid = False
+        elif self._valid:
+            self._valid = recover is not None and recover()
+            self.recovered += failed and self._valid
+        return self._valid
+
+    def summary(self) -> str:
+        return (f"Общие префиксы: выполнено {self.built}, продолжено с контрольной точки {self.resumed}, "
+                f"восстановлено после падений {self.recovered}, изолированных повторов {self.fallbacks}.")
@@ -0,0 +1,166 @@
+import heapq
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger("Карта Жителя")
+
+DEFAULT_COSTS_FILE = Path(__file__).resolve().parent.parent / ".cache" / "screen_costs.json"
+
+# Маркер экрана: локатор элемента и ожидаемый текст (None — достаточно наличия элемента)
+Marker = Tuple[Tuple[str, str], Optional[str]]
+
+
+class ScreenNode(NamedTuple):
+    """Экран приложения, который распознается по всем своим маркерам."""
+    name: str
+    markers: Tuple[Marker, ...]
+
+
+class Edge(NamedTuple):
+    """Переход между экранами: действие и его начальная оценка стоимости, сек."""
+    source: str
+    target: str
+    name: str
+    action: Callable[[], None]
+    cost: float
+
+
+class EdgeCosts:
+    """
+    Стоимость переходов, уточняемая по фактическому времени выполнения (экспоненциальное скользящее среднее).
+    Значения сохраняются в файл и используются следующими прогонами; записи других воркеров при сохранении
+    не затираются.
+    """
+
+    def __init__(self, path: Optional[Path] = DEFAULT_COSTS_FILE, alpha: float = 0.3):
+        """
+        :param path: Файл со стоимостями переходов (None — не сохранять).
+        :param alpha: Вес нового измерения в скользящем среднем.
+        """
+        self.path = path
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._costs: Dict[str, float] = self._load()
+        self._updated: Dict[str, float] = {}
+        self.version = 0
+
+    @classmethod
+    def from_env(cls) -> "EdgeCosts":
+        """Файл стоимостей из переменной окружения SCREEN_COSTS_FILE."""
+        return cls(Path(os.getenv("SCREEN_COSTS_FILE", DEFAULT_COSTS_FILE)))
+
+    @staticmethod
+    def key(edge: Edge) -> str:
+        return f"{edge.source}->{edge.target}:{edge.name}"
+
+    def _load(self) -> Dict[str, float]:
+        if self.path is None:
+            return {}
+        try:
+            return {key: float(value) for key, value in json.loads(self.path.read_text(encoding="utf-8")).items()}
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, edge: Edge) -> float:
+        return self._costs.get(self.key(edge), edge.cost)
+
+    def record(self, edge: Edge, seconds: float) -> None:
+        """Учет фактического времени перехода."""
+        with self._lock:
+            key = self.key(edge)
+            previous = self._costs.get(key, edge.cost)
+            self._costs[key] = self._updated[key] = round(previous + self.alpha * (seconds - previous), 3)
+            self.version += 1
+
+    def save(self) -> None:
+        """Сохраняет уточненные стоимости, сохраняя записи других процессов."""
+        if self.path is None or not self._updated:
+            return
+        with self._lock:
+            merged = {**self._load(), **self._updated}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(merged, indent=2, sort_keys=True, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+
+
+class ScreenGraph:
+    """
+    Граф экранов: узлы распознаются по маркерам на снимке экрана, ребра — действия экранов.
+    Путь между экранами ищется алгоритмом Дейкстры по текущим стоимостям переходов; найденные пути
+    запоминаются до изменения стоимостей.
+    """
+
+    def __init__(self, costs: Optional[EdgeCosts] = None):
+        self.costs = costs or EdgeCosts(path=None)
+        self.nodes: Dict[str, ScreenNode] = {}
+        self._edges: Dict[str, List[Edge]] = {}
+        self._paths: Dict[Tuple[str, str], Optional[List[Edge]]] = {}
+        self._paths_version = -1
+
+    def add_node(self, name: str, *markers: Marker) -> None:
+        """Экраны проверяются при распознавании в порядке добавления: более специфичные добавляются раньше."""
+        self.nodes[name] = ScreenNode(name, markers)
+        self._edges.setdefault(name, [])
+
+    def add_edge(self, source: str, target: str, name: str, action: Callable[[], None], cost: float) -> None:
+        for node in (source, target):
+            if node not in self.nodes:
+                raise ValueError(f"Неизвестный экран: {node}")
+        self._edges[source].append(Edge(source, target, name, action, cost))
+        self._paths.clear()
+
+    def edges(self, source: str) -> List[Edge]:
+        return list(self._edges.get(source, []))
+
+    def identify(self, snapshot) -> Optional[str]:
+        """
+        Экран, все маркеры которого есть на снимке.
+        :param snapshot: Снимок экрана (PageSnapshot).
+        :return: Имя экрана или None, если экран не распознан.
+        """
+        for node in self.nodes.values():
+            if all(snapshot.exists(locator) if text is None else snapshot.text(locator) == text
+                   for locator, text in node.markers):
+                return node.name
+        return None
+
+    def shortest_path(self, source: str, target: str) -> Optional[List[Edge]]:
+        """
+        Самый дешевый путь между экранами.
+        :return: Список переходов (пустой, если source == target) или None, если пути нет.
+        """
+        if self._paths_version != self.costs.version:
+            self._paths.clear()
+            self._paths_version = self.costs.version
+        key = (source, target)
+        if key not in self._paths:
+            self._paths[key] = self._dijkstra(source, target)
+        return self._paths[key]
+
+    def _dijkstra(self, source: str, target: str) -> Optional[List[Edge]]:
+        distances = {source: 0.0}
+        previous: Dict[str, Edge] = {}
+        queue = [(0.0, source)]
+        while queue:
+            distance, node = heapq.heappop(queue)
+            if node == target:
+                path = []
+                while node != source:
+                    edge = previous[node]
+                    path.append(edge)
+                    node = edge.source
+                return path[::-1]
+            if distance > distances.get(node, float("inf")):
+                continue
+            for edge in self._edges.get(node, []):
+                candidate = distance + max(self.costs.get(edge), 0.0)
+                if candidate < distances.get(edge.target, float("inf")):
+                    distances[edge.target] = candidate
+                    previous[edge.target] = edge
+                    heapq.heappush(queue, (candidate, edge.target))
+        return None
@@ -0,0 +1,179 @@
+import logging
+import os
+import socket
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import List, Optional
+
+import pytest
+
+logger = logging.getLogger("Карта Жителя")
+
+# Приоритеты очереди на создание сессии: чем меньше значение, тем раньше выдается слот
+PRIORITY_CORE = 0
+PRIORITY_LIMITED = 1
+PRIORITY_DEFAULT = 2
+
+
+def item_priority(item: pytest.Item) -> int:
+    """
+    Приоритет теста в очереди по маркерам регрессионных наборов: core раньше limited.
+    :param item: Тест pytest.
+    """
+    if item.get_closest_marker("core"):
+        return PRIORITY_CORE
+    if item.get_closest_marker("limited"):
+        return PRIORITY_LIMITED
+    return PRIORITY_DEFAULT
+
+
+def node_priority(node) -> int:
+    """
+    Приоритет для узла pytest: для теста — по его маркерам, для сессии — наивысший среди собранных тестов
+    (сессия воркера переиспользуется всеми его тестами).
+    :param node: Узел pytest (Item или Session).
+    """
+    if isinstance(node, pytest.Item):
+        return item_priority(node)
+    items = getattr(node, "items", None) or []
+    return min((item_priority(item) for item in items), default=PRIORITY_DEFAULT)
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        return True  # На Windows os.kill завершает процесс, поэтому полагаемся только на TTL аренды
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Lease:
+    """Аренда слота на создание и жизнь одной сессии."""
+
+    def __init__(self, path: Path, waited: float):
+        self.path = path
+        self.waited = waited
+
+
+class SessionAdmission:
+    """
+    Контроль допуска к созданию сессий BrowserStack с учетом лимита параллельных сессий тарифа.
+    Слоты выдаются через лиз-файлы в общей директории, поэтому лимит соблюдается для всех воркеров и процессов
+    на машине. Ожидающие запросы обслуживаются по приоритету (core раньше limited), внутри приоритета — по очереди.
+    """
+
+    def __init__(self, limit: int, lease_dir: Path, poll_interval: float = 1.0, lease_ttl: float = 3 * 60 * 60):
+        """
+        :param limit: Максимальное количество одновременных сессий.
+        :param lease_dir: Общая для всех процессов директория с лиз-файлами.
+        :param poll_interval: Интервал проверки освобождения слотов, сек.
+        :param lease_ttl: Время, после которого аренда считается брошенной, сек.
+        """
+        self.limit = limit
+        self.poll_interval = poll_interval
+        self.lease_ttl = lease_ttl
+        self.slots_dir = lease_dir / "slots"
+        self.queue_dir = lease_dir / "queue"
+        self.slots_dir.mkdir(parents=True, exist_ok=True)
+        self.queue_dir.mkdir(parents=True, exist_ok=True)
+        self.wait_times: List[float] = []
+
+    @classmethod
+    def from_env(cls) -> Optional["SessionAdmission"]:
+        """
+        Создает контроллер по переменным окружения:
+        BS_PARALLEL_LIMIT — лимит параллельных сессий (0 или не задан — контроль выключен),
+        BS_LEASE_DIR — директория лиз-файлов (по умолчанию во временной директории системы).
+        """
+        limit = int(os.getenv("BS_PARALLEL_LIMIT", "0"))
+        if limit <= 0:
+            return None
+        lease_dir = Path(os.getenv("BS_LEASE_DIR", Path(tempfile.gettempdir()) / "resident-card-sessions"))
+        return cls(limit=limit, lease_dir=lease_dir)
+
+    def acquire(self, priority: int = PRIORITY_DEFAULT, timeout: Optional[float] = None) -> Lease:
+        """
+        Встает в очередь и ждет свободный слот.
+        :param priority: Приоритет запроса (PRIORITY_CORE, PRIORITY_LIMITED, PRIORITY_DEFAULT).
+        :param timeout: Максимальное время ожидания, сек. None — ждать без ограничения.
+        :return: Аренда слота, которую нужно вернуть через release().
+        """
+        started = time.monotonic()
+        ticket = self.queue_dir / f"{priority}-{time.time_ns():020d}-{self._owner()}-{uuid.uuid4().hex[:8]}"
+        ticket.touch()
+        try:
+            while True:
+                self._cleanup_stale()
+                slot = self._try_take_slot(ticket)
+                if slot is not None:
+                    waited = time.monotonic() - started
+                    self.wait_times.append(waited)
+                    logger.info(f"Слот сессии {slot.name} получен, ожидание в очереди: {waited:.1f} с.")
+                    return Lease(slot, waited)
+                if timeout is not None and time.monotonic() - started > timeout:
+                    raise TimeoutError(f"Не дождались свободного слота сессии за {timeout} с")
+                time.sleep(self.poll_interval)
+        finally:
+            ticket.unlink(missing_ok=True)
+
+    def release(self, lease: Optional[Lease]) -> None:
+        """Освобождает слот."""
+        if lease is not None:
+            lease.path.unlink(missing_ok=True)
+
+    def summary(self) -> str:
+        """Сводка по ожиданию в очереди для логов."""
+        if not self.wait_times:
+            return "Контроль допуска: сессии не запрашивались."
+        return (f"Контроль допуска: выдано слотов {len(self.wait_times)}, суммарное ожидание "
+                f"{sum(self.wait_times):.1f} с, максимальное {max(self.wait_times):.1f} с.")
+
+    def _try_take_slot(self, ticket: Path) -> Optional[Path]:
+        taken = {path.name for path in self.slots_dir.iterdir()}
+        free = self.limit - len(taken)
+        if free <= 0:
+            return None
+        queue = sorted(path.name for path in self.queue_dir.iterdir())
+        if ticket.name not in queue[:free]:
+            return None  # Впереди в очереди есть запросы с более высоким приоритетом или раньше вставшие
+        for index in range(self.limit):
+            slot = self.slots_dir / f"slot-{index}"
+            if slot.name in taken:
+                continue
+            try:
+                fd = os.open(slot, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(self._owner())
+            return slot
+        return None
+
+    def _cleanup_stale(self) -> None:
+        """Удаляет аренды и билеты упавших процессов или с истекшим TTL."""
+        for directory in (self.slots_dir, self.queue_dir):
+            for path in directory.iterdir():
+                try:
+                    owner = path.read_text() if directory is self.slots_dir else path.name.split("-")[2]
+                    expired = time.time() - path.stat().st_mtime > self.lease_ttl
+                except (OSError, IndexError):
+                    continue
+                if expired or self._owner_is_dead(owner):
+                    path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _owner() -> str:
+        return f"{socket.gethostname().replace('-', '_')}+{os.getpid()}"
+
+    @staticmethod
+    def _owner_is_dead(owner: str) -> bool:
+        host, _, pid = owner.rpartition("+")
+        if host != socket.gethostname().replace("-", "_") or not pid.isdigit():
+            return False
+        return not _pid_alive(int(pid))
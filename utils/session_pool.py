@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+from typing import Any, Callable, Optional
+
+import pytest
+from appium.webdriver.webdriver import WebDriver
+
+from utils.context_tracker import ContextTracker
+
+logger = logging.getLogger("Карта Жителя")
+
+
+class ResetPolicy:
+    """
+    Политика сброса приложения между тестами при переиспользовании сессии.
+    Значения переменной окружения SESSION_RESET_POLICY:
+        - "test"  — сброс перед каждым тестом (по умолчанию);
+        - "class" — сброс при смене тестового класса;
+        - "<N>"   — сброс каждые N тестов.
+    """
+    PER_TEST = "test"
+    PER_CLASS = "class"
+
+    def __init__(self, mode: str = PER_TEST, every: int = 1):
+        self.mode = mode
+        self.every = every
+
+    @classmethod
+    def from_env(cls) -> "ResetPolicy":
+        value = os.getenv("SESSION_RESET_POLICY", cls.PER_TEST).strip().lower()
+        if value in (cls.PER_TEST, cls.PER_CLASS):
+            return cls(mode=value)
+        if value.isdigit() and int(value) > 0:
+            return cls(mode="count", every=int(value))
+        raise ValueError(f"Неизвестная политика сброса сессии: {value}")
+
+    def needs_reset(self, item: pytest.Item, previous: Optional[pytest.Item], tests_since_reset: int) -> bool:
+        """
+        Определяет, нужно ли сбрасывать приложение перед тестом.
+        :param item: Тест, который будет выполнен.
+        :param previous: Предыдущий тест, выполненный в этой сессии.
+        :param tests_since_reset: Количество тестов, выполненных после последнего сброса.
+        """
+        if previous is None:
+            return False
+        if self.mode == self.PER_CLASS:
+            return getattr(item, "cls", None) is not getattr(previous, "cls", None)
+        return tests_since_reset >= self.every
+
+    def __repr__(self) -> str:
+        return f"ResetPolicy(mode={self.mode!r}, every={self.every})"
+
+
+class SessionPool:
+    """
+    Пул из одной Appium-сессии на воркер pytest.
+    Сессия создается один раз и сбрасывается между тестами циклом terminate/clear/activate приложения.
+    Если сброс не удался, сессия закрывается и создается новая.
+    """
+
+    def __init__(self, factory: Callable[[], Any], policy: Optional[ResetPolicy] = None,
+                 rename_sessions: bool = False):
+        """
+        :param factory: Функция, возвращающая объект с запущенным драйвером (DriverSetup после setup_driver()).
+        :param policy: Политика сброса приложения между тестами.
+        :param rename_sessions: Переименовывать сессию BrowserStack под каждый тест.
+        """
+        self.factory = factory
+        self.policy = policy or ResetPolicy.from_env()
+        self.rename_sessions = rename_sessions
+        self._setup: Optional[Any] = None
+        self._app_id: Optional[str] = None
+        self._previous: Optional[pytest.Item] = None
+        self._previous_failed = False
+        self._tests_since_reset = 0
+        self.sessions_created = 0
+        self.resets = 0
+
+    @property
+    def driver(self) -> Optional[WebDriver]:
+        return self._setup.driver if self._setup else None
+
+    def acquire(self, item: pytest.Item, keep_state: bool = False) -> WebDriver:
+        """
+        Возвращает драйвер для теста, при необходимости сбрасывая приложение или пересоздавая сессию.
+        :param item: Тест, для которого запрашивается драйвер.
+        :param keep_state: Не сбрасывать приложение (тест продолжает с контрольной точки предыдущего теста).
+        """
+        if self._setup is None:
+            self._new_session()
+        elif not keep_state and (self._previous_failed
+                                 or self.policy.needs_reset(item, self._previous, self._tests_since_reset)):
+            if not self._reset_app():
+                self._discard()
+                self._new_session()
+        self._previous = item
+        self._previous_failed = False
+        self._tests_since_reset += 1
+        if self.rename_sessions:
+            rename_session(self.driver, item.name)
+        return self.driver
+
+    def release(self, failed: bool = False) -> None:
+        """
+        Возвращает сессию в пул после теста.
+        :param failed: Тест упал — перед следующим тестом приложение будет сброшено независимо от политики.
+        """
+        self._previous_failed = failed
+
+    def close(self) -> None:
+        """Закрывает сессию в конце прогона."""
+        logger.info(f"Пул сессий: создано сессий {self.sessions_created}, сбросов приложения {self.resets}.")
+        self._discard()
+
+    def _new_session(self) -> None:
+        self._setup = self.factory()
+        self._app_id = None
+        self._tests_since_reset = 0
+        self.sessions_created += 1
+
+    def _discard(self) -> None:
+        if self._setup is None:
+            return
+        try:
+            self._setup.teardown()
+        except Exception as e:
+            logger.warning(f"Ошибка при закрытии сессии: {e}")
+        self._setup = None
+
+    def _reset_app(self) -> bool:
+        """Сброс приложения: terminate, очистка данных и повторный запуск. Возвращает False при ошибке."""
+        driver = self.driver
+        try:
+            app_id = self._get_app_id(driver)
+            driver.terminate_app(app_id)
+            driver.execute_script("mobile: clearApp", {"appId": app_id})
+            driver.activate_app(app_id)
+            ContextTracker.for_driver(driver).invalidate()  # Приложение перезапущено в нативном контексте
+        except Exception as e:
+            logger.warning(f"Не удалось сбросить приложение, создаем новую сессию: {e}")
+            return False
+        self._tests_since_reset = 0
+        self.resets += 1
+        logger.info(f"Приложение {app_id} сброшено, сессия переиспользована.")
+        return True
+
+    def _get_app_id(self, driver: WebDriver) -> str:
+        if self._app_id is None:
+            self._app_id = driver.capabilities.get("appPackage") or driver.current_package
+        return self._app_id
+
+
+def rename_session(driver: WebDriver, name: str) -> None:
+    """
+    Переименовывает сессию BrowserStack под текущий тест.
+    :param driver: Драйвер сессии.
+    :param name: Новое имя сессии.
+    """
+    payload = {"action": "setSessionName", "arguments": {"name": name}}
+    try:
+        driver.execute_script(f"browserstack_executor: {json.dumps(payload, ensure_ascii=False)}")
+    except Exception as e:
+        logger.warning(f"Не удалось переименовать сессию BrowserStack: {e}")
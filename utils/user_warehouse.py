@@ -0,0 +1,269 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger("Карта Жителя")
+
+DEFAULT_WAREHOUSE_PATH = Path(__file__).resolve().parent.parent / ".cache" / "users.sqlite3"
+
+# Статусы пользователей склада
+PROVISIONING = "provisioning"
+AVAILABLE = "available"
+LEASED = "leased"
+RETIRED = "retired"
+
+
+class UserLease(NamedTuple):
+    """Пользователь, выданный тесту в аренду."""
+    id: int
+    phone: str
+    password: str
+    data: Dict[str, Any]
+    owner: str
+
+
+def lease_owner() -> str:
+    """Владелец аренды: хост, процесс и воркер pytest-xdist."""
+    return f"{socket.gethostname()}:{os.getpid()}:{os.getenv('PYTEST_XDIST_WORKER', 'main')}"
+
+
+class UserWarehouse:
+    """
+    Склад заранее созданных тестовых пользователей в файле SQLite, общий для всех воркеров и процессов на машине.
+    Пользователь выдается в аренду атомарно (BEGIN IMMEDIATE) на ограниченное время: аренда упавшего воркера
+    истекает, и пользователь снова становится доступен. Израсходованные пользователи (например, заказавшие карту)
+    списываются и больше не выдаются.
+    """
+
+    def __init__(self, path: Path = DEFAULT_WAREHOUSE_PATH, lease_ttl: float = 30 * 60,
+                 provisioning_ttl: float = 10 * 60):
+        """
+        :param path: Файл базы склада.
+        :param lease_ttl: Время аренды пользователя, сек.
+        :param provisioning_ttl: Время, после которого незавершенное создание пользователя считается брошенным, сек.
+        """
+        self.path = Path(path)
+        self.lease_ttl = lease_ttl
+        self.provisioning_ttl = provisioning_ttl
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._transaction() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, phone TEXT UNIQUE, password TEXT, data TEXT, "
+                "status TEXT NOT NULL, owner TEXT, expires REAL, created REAL NOT NULL)")
+
+    @classmethod
+    def from_env(cls) -> Optional["UserWarehouse"]:
+        """
+        Склад с настройками из окружения или None, если он не включен.
+        USER_WAREHOUSE=true — включить; USER_WAREHOUSE_PATH — файл базы; USER_LEASE_TTL — время аренды, сек.
+        """
+        if os.getenv("USER_WAREHOUSE") != "true":
+            return None
+        return cls(Path(os.getenv("USER_WAREHOUSE_PATH", DEFAULT_WAREHOUSE_PATH)),
+                   lease_ttl=float(os.getenv("USER_LEASE_TTL", str(30 * 60))))
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Транзакция с блокировкой записи на все время: проверка и изменение статуса выполняются атомарно."""
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        finally:
+            connection.close()
+
+    def add(self, phone: str, password: str, data: Optional[Dict[str, Any]] = None) -> None:
+        """Добавляет готового пользователя на склад."""
+        with self._transaction() as connection:
+            connection.execute("INSERT OR IGNORE INTO users (phone, password, data, status, created) "
+                               "VALUES (?, ?, ?, ?, ?)",
+                               (phone, password, json.dumps(data or {}, ensure_ascii=False), AVAILABLE, time.time()))
+
+    def reserve_slot(self, target: int) -> Optional[int]:
+        """
+        Резервирует место под нового пользователя, если запас вместе с создаваемыми пользователями меньше target.
+        :return: Идентификатор резерва или None, если пополнение не нужно.
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM users WHERE status = ? AND expires < ?", (PROVISIONING, now))
+            (stock,) = connection.execute(
+                "SELECT COUNT(*) FROM users WHERE status IN (?, ?) OR (status = ? AND expires < ?)",
+                (AVAILABLE, PROVISIONING, LEASED, now)).fetchone()
+            if stock >= target:
+                return None
+            cursor = connection.execute("INSERT INTO users (status, owner, expires, created) VALUES (?, ?, ?, ?)",
+                                        (PROVISIONING, lease_owner(), now + self.provisioning_ttl, now))
+            return cursor.lastrowid
+
+    def fill_slot(self, slot: int, phone: str, password: str, data: Dict[str, Any]) -> None:
+        """Записывает созданного пользователя в зарезервированное место."""
+        with self._transaction() as connection:
+            connection.execute("UPDATE users SET phone = ?, password = ?, data = ?, status = ?, owner = NULL, "
+                               "expires = NULL WHERE id = ?",
+                               (phone, password, json.dumps(data, ensure_ascii=False), AVAILABLE, slot))
+
+    def cancel_slot(self, slot: int) -> None:
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM users WHERE id = ? AND status = ?", (slot, PROVISIONING))
+
+    def lease(self, owner: Optional[str] = None) -> Optional[UserLease]:
+        """
+        Выдает пользователя в аренду: доступного или с истекшей арендой, начиная с самого старого.
+        :param owner: Владелец аренды (по умолчанию — текущий процесс).
+        :return: Аренда или None, если склад пуст.
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT id, phone, password, data FROM users WHERE status = ? OR (status = ? AND expires < ?) "
+                "ORDER BY created LIMIT 1", (AVAILABLE, LEASED, now)).fetchone()
+            if row is None:
+                return None
+            owner = owner or lease_owner()
+            connection.execute("UPDATE users SET status = ?, owner = ?, expires = ? WHERE id = ?",
+                               (LEASED, owner, now + self.lease_ttl, row[0]))
+        return UserLease(row[0], row[1], row[2], json.loads(row[3] or "{}"), owner)
+
+    def renew(self, lease: UserLease) -> bool:
+        """
+        Продлевает аренду на lease_ttl от текущего момента.
+        :return: False, если аренда уже потеряна (истекла и пользователь выдан другому владельцу).
+        """
+        with self._transaction() as connection:
+            cursor = connection.execute("UPDATE users SET expires = ? WHERE id = ? AND status = ? AND owner = ?",
+                                        (time.time() + self.lease_ttl, lease.id, LEASED, lease.owner))
+            return cursor.rowcount == 1
+
+    def release(self, lease: UserLease) -> None:
+        """Возвращает пользователя на склад."""
+        self._set_status(lease, AVAILABLE)
+
+    def retire(self, lease: UserLease) -> None:
+        """Списывает израсходованного пользователя."""
+        self._set_status(lease, RETIRED)
+
+    def _set_status(self, lease: UserLease, status: str) -> None:
+        with self._transaction() as connection:
+            connection.execute("UPDATE users SET status = ?, owner = NULL, expires = NULL "
+                               "WHERE id = ? AND status = ?", (status, lease.id, LEASED))
+
+    def counts(self) -> Dict[str, int]:
+        """Количество пользователей по статусам."""
+        with self._transaction() as connection:
+            return dict(connection.execute("SELECT status, COUNT(*) FROM users GROUP BY status").fetchall())
+
+    def summary(self) -> str:
+        counts = self.counts()
+        return (f"Склад пользователей: доступно {counts.get(AVAILABLE, 0)}, в аренде {counts.get(LEASED, 0)}, "
+                f"создается {counts.get(PROVISIONING, 0)}, списано {counts.get(RETIRED, 0)}.")
+
+
+class WarehouseProvisioner:
+    """
+    Фоновое пополнение склада до целевого запаса.
+    Место под пользователя резервируется на складе до создания, поэтому пополнители всех воркеров вместе
+    не создают больше target пользователей. Тесты не ждут пополнения: они берут готовых пользователей со склада.
+    """
+
+    def __init__(self, warehouse: UserWarehouse, create: Callable[[], Tuple[str, str, Dict[str, Any]]],
+                 target: int = 3, poll_interval: float = 30):
+        """
+        :param warehouse: Склад пользователей.
+        :param create: Создание пользователя; возвращает (phone, password, data).
+        :param target: Целевой запас доступных пользователей.
+        :param poll_interval: Интервал проверки запаса, сек.
+        """
+        self.warehouse = warehouse
+        self.create = create
+        self.target = target
+        self.poll_interval = poll_interval
+        self.created = 0
+        self.failed = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="user-provisioner", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        """Останавливает пополнение; создаваемый пользователь дописывается, если успеет за timeout."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def refill(self) -> None:
+        """Создает пользователей, пока запас меньше целевого."""
+        while not self._stop.is_set():
+            slot = self.warehouse.reserve_slot(self.target)
+            if slot is None:
+                return
+            try:
+                phone, password, data = self.create()
+                self.warehouse.fill_slot(slot, phone, password, data)
+            except Exception as e:
+                self.warehouse.cancel_slot(slot)
+                self.failed += 1
+                logger.warning(f"Не удалось создать пользователя для склада: {e}")
+                return
+            self.created += 1
+            logger.info(f"Пользователь {phone} добавлен на склад.")
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refill()
+            except Exception as e:
+                logger.warning(f"Ошибка пополнения склада пользователей: {e}")
+            self._stop.wait(self.poll_interval)
+
+
+class LeaseHeartbeat:
+    """
+    Фоновое продление аренды пользователя, который нужен дольше lease_ttl (например, на весь прогон):
+    без продления аренда истекает, и пользователя выдают другому воркеру посреди прогона.
+    """
+
+    def __init__(self, warehouse: UserWarehouse, lease: UserLease, interval: Optional[float] = None):
+        """
+        :param warehouse: Склад пользователей.
+        :param lease: Продлеваемая аренда.
+        :param interval: Интервал продления, сек (по умолчанию — треть lease_ttl).
+        """
+        self.warehouse = warehouse
+        self.lease = lease
+        self.interval = interval or warehouse.lease_ttl / 3
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="lease-heartbeat", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                if not self.warehouse.renew(self.lease):
+                    logger.warning(f"Аренда пользователя {self.lease.phone} потеряна, продление остановлено.")
+                    return
+            except Exception as e:
+                logger.warning(f"Не удалось продлить аренду пользователя {self.lease.phone}: {e}")
@@ -0,0 +1,115 @@
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from selenium.common import NoSuchElementException, TimeoutException
+
+logger = logging.getLogger("Карта Жителя")
+
+
+class WaitStats:
+    """Статистика ожиданий по локаторам: количество ожиданий, опросов, таймаутов и суммарное время."""
+
+    def __init__(self):
+        self._stats: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {"waits": 0, "polls": 0, "timeouts": 0, "seconds": 0.0, "max_polls": 0})
+        self._lock = threading.Lock()
+
+    def record(self, key: str, polls: int, elapsed: float, success: bool) -> None:
+        with self._lock:
+            stats = self._stats[key]
+            stats["waits"] += 1
+            stats["polls"] += polls
+            stats["seconds"] += elapsed
+            stats["max_polls"] = max(stats["max_polls"], polls)
+            if not success:
+                stats["timeouts"] += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {key: dict(stats) for key, stats in self._stats.items()}
+
+    def format_report(self, limit: int = 20) -> str:
+        """Таблица локаторов, на ожидание которых ушло больше всего времени."""
+        rows = sorted(self.snapshot().items(), key=lambda item: -item[1]["seconds"])[:limit]
+        lines = [f"{'ожиданий':>9}{'опросов':>9}{'макс.':>7}{'таймаутов':>11}{'сек':>9}  локатор"]
+        for key, stats in rows:
+            lines.append(f"{stats['waits']:>9}{stats['polls']:>9}{stats['max_polls']:>7}{stats['timeouts']:>11}"
+                         f"{stats['seconds']:>9.1f}  {key}")
+        return "\n".join(lines)
+
+
+# Общая статистика ожиданий процесса, выводится в лог в конце прогона
+wait_stats = WaitStats()
+
+
+class WaitEngine:
+    """
+    Механизм ожидания условий с экспоненциальным интервалом опроса.
+    Первая проверка выполняется сразу, затем интервал растет от initial_poll в backoff раз до max_poll:
+    короткие ожидания не теряют время на фиксированный интервал, а длинные не перегружают сервер.
+    """
+
+    def __init__(self, initial_poll: float = 0.1, backoff: float = 1.5, max_poll: float = 1.0,
+                 stats: Optional[WaitStats] = wait_stats):
+        """
+        :param initial_poll: Интервал после первой проверки, сек.
+        :param backoff: Множитель интервала после каждой неудачной проверки.
+        :param max_poll: Максимальный интервал опроса, сек.
+        :param stats: Куда писать статистику опросов (None — не собирать).
+        """
+        self.initial_poll = initial_poll
+        self.backoff = backoff
+        self.max_poll = max_poll
+        self.stats = stats
+
+    @classmethod
+    def from_env(cls) -> "WaitEngine":
+        """Параметры из переменных окружения WAIT_INITIAL_POLL, WAIT_BACKOFF, WAIT_MAX_POLL."""
+        return cls(initial_poll=float(os.getenv("WAIT_INITIAL_POLL", "0.1")),
+                   backoff=float(os.getenv("WAIT_BACKOFF", "1.5")),
+                   max_poll=float(os.getenv("WAIT_MAX_POLL", "1.0")))
+
+    def until(self, driver, condition: Callable[[Any], Any], timeout: float, message: str = "",
+              key: Optional[str] = None,
+              ignored_exceptions: Tuple[type, ...] = (NoSuchElementException,)) -> Any:
+        """
+        Ждет, пока condition(driver) вернет истинное значение.
+        :param driver: Драйвер.
+        :param condition: Условие ожидания (например, expected_conditions.presence_of_element_located).
+        :param timeout: Максимальное время ожидания, сек.
+        :param message: Сообщение TimeoutException.
+        :param key: Ключ статистики (обычно строковое представление локатора).
+        :param ignored_exceptions: Исключения, которые считаются «условие еще не выполнено».
+        :return: Результат условия.
+        """
+        started = time.monotonic()
+        deadline = started + timeout
+        poll = self.initial_poll
+        polls = 0
+        while True:
+            polls += 1
+            try:
+                value = condition(driver)
+                if value:
+                    self._record(key, polls, started, success=True)
+                    return value
+            except ignored_exceptions:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._record(key, polls, started, success=False)
+                raise TimeoutException(message)
+            time.sleep(min(poll, remaining))
+            poll = min(poll * self.backoff, self.max_poll)
+
+    def _record(self, key: Optional[str], polls: int, started: float, success: bool) -> None:
+        if self.stats is not None and key is not None:
+            self.stats.record(key, polls, time.monotonic() - started, success)